@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CMSproject.settings')
 
 application = get_asgi_application()
+
+# Optional (CHATBOT_WARMUP): load the chatbot model and indexes before serving (see wsgi.py)
+from chatbot.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -67,6 +67,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'chatbot.ratelimit.RateLimitMiddleware',  # per-route, per-IP limits from RATE_LIMIT_POLICIES
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,6 +76,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# ASGI mode (gunicorn + uvicorn workers, see DEPLOYMENT_GUIDE.md): the chatbot uses its async views
+ASGI_MODE = os.environ.get('ASGI_MODE', 'False') == 'True'
+
 # CORS Configuration - Dynamic based on DEBUG
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
@@ -216,7 +220,9 @@ SIMPLE_JWT = {
 }
 
 # session stored securely on server side (align with view.py 1-hour timeout)
-SESSION_ENGINE = "django.contrib.sessions.backends.db"  # Use database sessions for Render
+# Set SESSION_ENGINE=django.contrib.sessions.backends.cache to keep sessions (chatbot state) in Redis,
+# so a chat turn does not cost a DB write; sessions may then be evicted under Redis memory pressure.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', "django.contrib.sessions.backends.db")  # Use database sessions for Render
 SESSION_COOKIE_AGE = 3600 # auto reset after 1 hour
 SESSION_SAVE_EVERY_REQUEST = True # update session on every request for accuracy
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True # clear on browser close for security
@@ -245,6 +251,87 @@ else:
         }
     }
 
+# rate limiting (chatbot.ratelimit.RateLimitMiddleware): sliding-window limits per client IP and path prefix.
+# Render's load balancer appends the client address to X-Forwarded-For, so trust one proxy hop there.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 1 if os.environ.get('RENDER') else 0))
+RATE_LIMIT_POLICIES = [
+    {'name': 'chatbot', 'path': '/api/chatbot/', 'limit': int(os.environ.get('CHATBOT_IP_RATE_LIMIT', 50)), 'window': 60},
+    {'name': 'admin_login', 'path': '/api/admin/login/', 'limit': 10, 'window': 60, 'methods': ['POST']},
+]
+
+# chatbot matching: minimum normalized BM25 score for a lexical QA match (0-1)
+CHATBOT_LEXICAL_THRESHOLD = float(os.environ.get('CHATBOT_LEXICAL_THRESHOLD', 0.5))
+
+# chatbot embeddings for semantic matching: 'onnx' (int8 model in CHATBOT_ONNX_MODEL_DIR, created with
+# `manage.py export_onnx_embeddings`, needs onnxruntime + tokenizers), 'sentence-transformers' (torch), 'auto' (first
+# of those that is installed) or 'none'; CHATBOT_EMBEDDING_THREADS caps the onnxruntime threads per worker
+CHATBOT_EMBEDDING_BACKEND = os.environ.get('CHATBOT_EMBEDDING_BACKEND', 'auto')
+CHATBOT_ONNX_MODEL_DIR = os.environ.get('CHATBOT_ONNX_MODEL_DIR', os.path.join(BASE_DIR, 'chatbot', 'onnx_model'))
+CHATBOT_EMBEDDING_THREADS = int(os.environ['CHATBOT_EMBEDDING_THREADS']) if os.environ.get('CHATBOT_EMBEDDING_THREADS') else None
+
+# chatbot answer tiers: cosine similarity for a semantic QA match, and the medium-confidence scores at which
+# the top CHATBOT_SUGGEST_TOP_K pairs are answered with a "did you mean" hint instead of calling Gemini
+# (set a suggest threshold above 1 to turn that tier off)
+CHATBOT_SEMANTIC_THRESHOLD = float(os.environ.get('CHATBOT_SEMANTIC_THRESHOLD', 0.8))
+CHATBOT_SEMANTIC_SUGGEST_THRESHOLD = float(os.environ.get('CHATBOT_SEMANTIC_SUGGEST_THRESHOLD', 0.65))
+CHATBOT_LEXICAL_SUGGEST_THRESHOLD = float(os.environ.get('CHATBOT_LEXICAL_SUGGEST_THRESHOLD', 0.4))
+CHATBOT_SUGGEST_TOP_K = int(os.environ.get('CHATBOT_SUGGEST_TOP_K', 2))
+
+# chatbot Gemini pool: calls in flight per worker, and how long a request may queue for a slot (seconds)
+CHATBOT_GEMINI_MODEL = os.environ.get('CHATBOT_GEMINI_MODEL', 'gemini-2.0-flash-lite')
+CHATBOT_GEMINI_MAX_CONCURRENCY = int(os.environ.get('CHATBOT_GEMINI_MAX_CONCURRENCY', 4))
+CHATBOT_GEMINI_QUEUE_TIMEOUT = float(os.environ.get('CHATBOT_GEMINI_QUEUE_TIMEOUT', 5))
+
+# chatbot Gemini deadline (seconds) and circuit breaker: after CHATBOT_BREAKER_FAILURES consecutive errors,
+# timeouts or replies slower than CHATBOT_BREAKER_SLOW_MS, answer from the Q&A pairs for CHATBOT_BREAKER_RESET_TIMEOUT seconds
+CHATBOT_GEMINI_TIMEOUT = float(os.environ.get('CHATBOT_GEMINI_TIMEOUT', 20))
+CHATBOT_BREAKER_FAILURES = int(os.environ.get('CHATBOT_BREAKER_FAILURES', 5))
+CHATBOT_BREAKER_SLOW_MS = float(os.environ.get('CHATBOT_BREAKER_SLOW_MS', 10000))
+CHATBOT_BREAKER_RESET_TIMEOUT = float(os.environ.get('CHATBOT_BREAKER_RESET_TIMEOUT', 30))
+
+# load testing only: answer Gemini calls from a local stub with this latency (seconds) and error rate (0-1)
+CHATBOT_GEMINI_STUB = os.environ.get('CHATBOT_GEMINI_STUB', 'False') == 'True'
+CHATBOT_GEMINI_STUB_LATENCY = float(os.environ.get('CHATBOT_GEMINI_STUB_LATENCY', 0.8))
+CHATBOT_GEMINI_STUB_ERROR_RATE = float(os.environ.get('CHATBOT_GEMINI_STUB_ERROR_RATE', 0))
+
+# chatbot response cache: shared TTL (Redis/LocMem) and the per-worker in-memory LRU in front of it (seconds/entries)
+CHATBOT_RESPONSE_CACHE_TTL = int(os.environ.get('CHATBOT_RESPONSE_CACHE_TTL', 3600))
+CHATBOT_RESPONSE_L1_TTL = int(os.environ.get('CHATBOT_RESPONSE_L1_TTL', 60))
+CHATBOT_RESPONSE_L1_SIZE = int(os.environ.get('CHATBOT_RESPONSE_L1_SIZE', 512))
+
+# chatbot semantic response cache: reuse a recent Gemini answer when a new question is this similar (0-1);
+# the lexical threshold applies when no embedding model is installed (character n-gram similarity)
+CHATBOT_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('CHATBOT_SEMANTIC_CACHE_THRESHOLD', 0.93))
+CHATBOT_SEMANTIC_CACHE_LEXICAL_THRESHOLD = float(os.environ.get('CHATBOT_SEMANTIC_CACHE_LEXICAL_THRESHOLD', 0.97))
+CHATBOT_SEMANTIC_CACHE_SIZE = int(os.environ.get('CHATBOT_SEMANTIC_CACHE_SIZE', 256))
+
+# chatbot Gemini prompt: Q&A pairs retrieved per question, and the approximate prompt size they must fit in (tokens)
+CHATBOT_RAG_TOP_K = int(os.environ.get('CHATBOT_RAG_TOP_K', 4))
+CHATBOT_PROMPT_TOKEN_BUDGET = int(os.environ.get('CHATBOT_PROMPT_TOKEN_BUDGET', 800))
+
+# chatbot conversation context in Gemini prompts: the last CHATBOT_CONTEXT_RECENT_TURNS exchanges in full,
+# older ones as one-line summaries, all within CHATBOT_CONTEXT_TOKEN_BUDGET tokens
+CHATBOT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHATBOT_CONTEXT_TOKEN_BUDGET', 200))
+CHATBOT_CONTEXT_RECENT_TURNS = int(os.environ.get('CHATBOT_CONTEXT_RECENT_TURNS', 1))
+
+# chatbot session: exchanges kept server-side (the prompt context is built from them)
+CHATBOT_HISTORY_TURNS = int(os.environ.get('CHATBOT_HISTORY_TURNS', 10))
+
+# chatbot popular questions: how many of the most asked questions are tracked for `manage.py warm_chatbot_cache`
+CHATBOT_POPULAR_QUESTIONS = int(os.environ.get('CHATBOT_POPULAR_QUESTIONS', 200))
+
+# chatbot warm-up: load the embedding model and build the Q&A indexes at startup instead of on the first question
+# (set GUNICORN_PRELOAD=True as well to do it once in the gunicorn master, see gunicorn.conf.py)
+CHATBOT_WARMUP = os.environ.get('CHATBOT_WARMUP', 'False') == 'True'
+
+# chatbot event log: turns and abuse events are queued in memory and written to ChatEvent in batches
+CHATBOT_EVENT_LOGGING = os.environ.get('CHATBOT_EVENT_LOGGING', 'True') == 'True'
+CHATBOT_EVENT_BATCH_SIZE = int(os.environ.get('CHATBOT_EVENT_BATCH_SIZE', 100))
+CHATBOT_EVENT_FLUSH_INTERVAL = float(os.environ.get('CHATBOT_EVENT_FLUSH_INTERVAL', 2))
+
+# chatbot single-flight: how long a request waits for an identical question already being answered (seconds)
+CHATBOT_SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('CHATBOT_SINGLE_FLIGHT_TIMEOUT', 30))
+
 # logging for security monitoring
 LOGGING = {
     'version': 1,
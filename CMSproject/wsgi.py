@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CMSproject.settings')
 
 application = get_wsgi_application()
+
+# Optional (CHATBOT_WARMUP): load the chatbot model and indexes before serving; with
+# GUNICORN_PRELOAD this runs once in the master and workers share it copy-on-write
+from chatbot.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -15,4 +15,9 @@ python manage.py migrate
 echo "👤 Creating superuser (if environment variables are set)..."
 python manage.py create_superuser
 
+if [ "${CHATBOT_WARM_CACHE:-0}" = "1" ]; then
+    echo "🔥 Warming chatbot response cache..."
+    python manage.py warm_chatbot_cache || true
+fi
+
 echo "✅ Build completed successfully!"
@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import QAPair, ChatEvent
 
-# Register your models here.
+@admin.register(QAPair)
+class QAPairAdmin(admin.ModelAdmin):
+    list_display = ('question', 'lang', 'category', 'embedding_model', 'updated_at')
+    list_filter = ('lang', 'category')
+    search_fields = ('question', 'answer')
+
+@admin.register(ChatEvent)
+class ChatEventAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'kind', 'tier', 'lang', 'question', 'latency_ms', 'input_tokens', 'output_tokens', 'ip')
+    list_filter = ('kind', 'tier', 'lang', 'created_at')
+    search_fields = ('question', 'answer', 'conversation_id', 'ip')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (reloads the knowledge base when QAPair rows change)
@@ -1,35 +1,129 @@
 import os
 import json
-import time
-import threading
+import uuid
 import logging
-from django.core.cache import cache
-from django.utils import timezone
-from django.core.mail import send_mail
+import contextvars
 from django.conf import settings
 
-# Optional: sentence-transformers for semantic matching
-# If not installed, will fall back to Gemini-only matching
-try:
-    import sentence_transformers
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
-    logging.warning("sentence-transformers not available, using Gemini-only matching")
 import google.generativeai as genai
+from asgiref.sync import sync_to_async
+from .knowledge_base import KnowledgeBase
+from .models import QAPair
+from .lexical_index import LexicalIndex
+from .gemini_pool import GeminiPool, GeminiBusyError
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .response_cache import ResponseCache, response_cache_key
+from .semantic_cache import SemanticResponseCache
+from .metrics import metrics
+from .spend import SpendTracker
+from .popular import PopularQuestions
+from .single_flight import SingleFlight
+from .context import ContextCompactor
+from .gemini_stub import StubGeminiModel
+from .events import chat_events
+from .embeddings import select_backend, load_model, model_id
 
 logger = logging.getLogger(__name__)
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-api_lock = threading.Lock()
+gemini_pool = GeminiPool(
+    getattr(settings, 'CHATBOT_GEMINI_MODEL', 'gemini-2.0-flash-lite'),
+    max_concurrency=getattr(settings, 'CHATBOT_GEMINI_MAX_CONCURRENCY', 4),
+    queue_timeout=getattr(settings, 'CHATBOT_GEMINI_QUEUE_TIMEOUT', 5.0),
+    timeout=getattr(settings, 'CHATBOT_GEMINI_TIMEOUT', 20.0),
+    # Stop calling Gemini for a while after repeated errors or slow replies; answers fall back to the Q&A pairs
+    breaker=CircuitBreaker(
+        'gemini',
+        failure_threshold=getattr(settings, 'CHATBOT_BREAKER_FAILURES', 5),
+        slow_call_ms=getattr(settings, 'CHATBOT_BREAKER_SLOW_MS', 10000),
+        reset_timeout=getattr(settings, 'CHATBOT_BREAKER_RESET_TIMEOUT', 30.0),
+    ),
+)
+if getattr(settings, 'CHATBOT_GEMINI_STUB', False):
+    # Load testing: answer from a local stub instead of the paid API
+    gemini_pool.set_model(StubGeminiModel(
+        latency=getattr(settings, 'CHATBOT_GEMINI_STUB_LATENCY', 0.8),
+        error_rate=getattr(settings, 'CHATBOT_GEMINI_STUB_ERROR_RATE', 0.0),
+    ))
+    logger.warning("CHATBOT_GEMINI_STUB is set: Gemini calls are answered by a local stub")
 
-model = None  # Lazy loaded in find_match function
+# Optional semantic matching: int8 ONNX model via onnxruntime, or sentence-transformers (torch)
+model = None  # Lazy loaded by get_embedding_model()
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_BACKEND = select_backend(
+    getattr(settings, 'CHATBOT_EMBEDDING_BACKEND', 'auto'),
+    getattr(settings, 'CHATBOT_ONNX_MODEL_DIR', None),
+)
+EMBEDDINGS_AVAILABLE = EMBEDDING_BACKEND is not None
+EMBEDDING_MODEL_ID = model_id(EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME) if EMBEDDINGS_AVAILABLE else ''
+if EMBEDDINGS_AVAILABLE:
+    from .semantic_index import SemanticIndex
+else:
+    logger.warning(
+        f"No embedding backend available (CHATBOT_EMBEDDING_BACKEND={getattr(settings, 'CHATBOT_EMBEDDING_BACKEND', 'auto')}): "
+        "semantic matching is off, questions are matched exactly and lexically (BM25) before Gemini"
+    )
+QA_DATA_PATH = os.path.join(os.path.dirname(__file__), 'qachatbot_data.json')
+# QAPair rows (seeded from qachatbot_data.json by migration 0003, edited through the admin API);
+# the JSON file only while the table is empty
+knowledge_base = KnowledgeBase(
+    QA_DATA_PATH,
+    getattr(settings, 'CHATBOT_KB_CHECK_INTERVAL', 5.0),
+    generation_key='chatbot_kb_generation',
+    model=QAPair,
+)
+# Answer tiers: exact -> high-confidence lexical/semantic -> "did you mean" suggestion -> Gemini
+SEMANTIC_MATCH_THRESHOLD = getattr(settings, 'CHATBOT_SEMANTIC_THRESHOLD', 0.8)
+LEXICAL_MATCH_THRESHOLD = getattr(settings, 'CHATBOT_LEXICAL_THRESHOLD', 0.5)
+SEMANTIC_SUGGEST_THRESHOLD = getattr(settings, 'CHATBOT_SEMANTIC_SUGGEST_THRESHOLD', 0.65)
+LEXICAL_SUGGEST_THRESHOLD = getattr(settings, 'CHATBOT_LEXICAL_SUGGEST_THRESHOLD', 0.4)
+SUGGEST_TOP_K = getattr(settings, 'CHATBOT_SUGGEST_TOP_K', 2)
+RAG_TOP_K = getattr(settings, 'CHATBOT_RAG_TOP_K', 4)
+RAG_MIN_LEXICAL_SCORE = 0.15
+RAG_MIN_SEMANTIC_SCORE = 0.3
+PROMPT_TOKEN_BUDGET = getattr(settings, 'CHATBOT_PROMPT_TOKEN_BUDGET', 800)
+lexical_index = LexicalIndex(knowledge_base)
+response_cache = ResponseCache(
+    ttl=getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', 3600),
+    l1_ttl=getattr(settings, 'CHATBOT_RESPONSE_L1_TTL', 60),
+    l1_max_entries=getattr(settings, 'CHATBOT_RESPONSE_L1_SIZE', 512),
+)
+# Cached answers are keyed by knowledge-base version, so old ones are never served after a reload;
+# drop this worker's in-memory copies right away instead of waiting for them to expire
+knowledge_base.add_listener(lambda kb: response_cache.clear_local())
+
+# Identical questions in flight at the same time share one Gemini call (per process and across workers)
+SINGLE_FLIGHT_TIMEOUT = getattr(settings, 'CHATBOT_SINGLE_FLIGHT_TIMEOUT', 30)
+gemini_flights = SingleFlight(lock_ttl=SINGLE_FLIGHT_TIMEOUT * 2, wait_timeout=SINGLE_FLIGHT_TIMEOUT)
+popular_questions = PopularQuestions(max_entries=getattr(settings, 'CHATBOT_POPULAR_QUESTIONS', 200))
 
 MAX_MESSAGES_PER_SESSION = 500
+MAX_HISTORY_TURNS = getattr(settings, 'CHATBOT_HISTORY_TURNS', 10)  # exchanges kept in the session
 MAX_WORDS_PER_QUESTION = 70
 MONTHLY_BUDGET = 25.0
 INPUT_PRICE_PER_1K = 0.0000375
 OUTPUT_PRICE_PER_1K = 0.00015
 ALERT_EMAIL = getattr(settings, 'ADMIN_ALERT_EMAIL', None)
+BUDGET_EXCEEDED_RESPONSE = "This chatbot is temporarily unavailable. Please try again later."
+GEMINI_ERROR_RESPONSE = 'Service temporarily unavailable. Please contact cms@civilmastersolution.com or try again later.'
+BUSY_RESPONSE = {
+    'en': 'CMSbot is handling many questions right now. Please try again in a moment or contact cms@civilmastersolution.com.',
+    'th': 'ขณะนี้ CMSbot มีผู้ใช้งานจำนวนมาก กรุณาลองใหม่อีกครั้งในอีกสักครู่ หรือติดต่อ cms@civilmastersolution.com',
+}
+# Medium-confidence answers (see compose_suggestion)
+SUGGESTION_HINT = {
+    'en': {'one': 'Did you mean "{question}"?', 'many': 'Did you mean one of these?'},
+    'th': {'one': 'คุณหมายถึง "{question}" ใช่หรือไม่?', 'many': 'คุณหมายถึงคำถามใดต่อไปนี้?'},
+}
+
+# While the Gemini circuit breaker is open: the closest Q&A answer behind this notice, or the canned reply
+DEGRADED_PREFIX = {
+    'en': 'Our AI assistant is temporarily unavailable, so here is the closest answer from our FAQ:\n\n',
+    'th': 'ขณะนี้ผู้ช่วย AI ไม่พร้อมใช้งานชั่วคราว นี่คือคำตอบที่ใกล้เคียงที่สุดจากคำถามที่พบบ่อย:\n\n',
+}
+DEGRADED_RESPONSE = {
+    'en': 'Our AI assistant is temporarily unavailable. Please try again in a few minutes or contact cms@civilmastersolution.com.',
+    'th': 'ขณะนี้ผู้ช่วย AI ไม่พร้อมใช้งานชั่วคราว กรุณาลองใหม่ในอีกไม่กี่นาที หรือติดต่อ cms@civilmastersolution.com',
+}
 
 company_data = {
     'en': {
@@ -58,179 +152,66 @@ company_data = {
     }
 }
 
-# Load QA Chatbot Data for dynamic system prompt
-def load_qachatbot_data():
-    """Load Q&A pairs from qachatbot_data.json"""
-    try:
-        with open(os.path.join(os.path.dirname(__file__), 'qachatbot_data.json'), 'r', encoding='utf-8') as f:
-            return json.load(f)['qa_pairs']
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Error loading qachatbot_data.json: {e}")
-        return []
+# Topic keywords, checked in order (first match wins)
+CATEGORY_KEYWORDS = [
+    ('company', ['cms', 'company', 'mission', 'vision', 'values', 'culture', 'behind', 'founded', 'who']),
+    ('products', ['product', 'fiber', 'steel', 'synthetic', 'ductil', 'armour', 'pp', 'pan', 'micro']),
+    ('technical', ['technical', 'design', 'engineering', 'drawing', 'optimization', 'tensile', 'strength', 'uhpfrc']),
+    ('projects', ['project', 'warehouse', 'pavement', 'industrial', 'flooring', 'example', 'biggest', 'completed']),
+    ('standards', ['standard', 'aci', 'en', 'tr34', 'aisc', 'compliance', 'international']),
+    ('cost', ['cost', 'price', 'comparison', 'budget', 'savings', 'value engineering']),
+    ('partnership', ['partner', 'collaboration', 'distributor', 'training', 'warranty', 'support']),
+    ('contact', ['contact', 'email', 'call', 'visit', 'response time', 'help']),
+]
 
-def build_system_prompt(lang='en'):
-    """Build dynamic system prompt from qachatbot_data.json with categorized examples"""
-    qa_pairs = load_qachatbot_data()
-    
-    # Filter by language
-    lang_qa = [qa for qa in qa_pairs if qa.get('lang', 'en') == lang]
-    
-    # Categorize Q&A pairs into topics
-    categories = {
-        'company': [],
-        'products': [],
-        'technical': [],
-        'projects': [],
-        'standards': [],
-        'cost': [],
-        'partnership': [],
-        'contact': []
-    }
-    
-    for qa in lang_qa:
-        question_lower = qa['question'].lower()
-        
-        # Categorize based on keywords
-        if any(kw in question_lower for kw in ['cms', 'company', 'mission', 'vision', 'values', 'culture', 'behind', 'founded', 'who']):
-            categories['company'].append(qa)
-        elif any(kw in question_lower for kw in ['product', 'fiber', 'steel', 'synthetic', 'ductil', 'armour', 'pp', 'pan', 'micro']):
-            categories['products'].append(qa)
-        elif any(kw in question_lower for kw in ['technical', 'design', 'engineering', 'drawing', 'optimization', 'tensile', 'strength', 'uhpfrc']):
-            categories['technical'].append(qa)
-        elif any(kw in question_lower for kw in ['project', 'warehouse', 'pavement', 'industrial', 'flooring', 'example', 'biggest', 'completed']):
-            categories['projects'].append(qa)
-        elif any(kw in question_lower for kw in ['standard', 'aci', 'en', 'tr34', 'aisc', 'compliance', 'international']):
-            categories['standards'].append(qa)
-        elif any(kw in question_lower for kw in ['cost', 'price', 'comparison', 'budget', 'savings', 'value engineering']):
-            categories['cost'].append(qa)
-        elif any(kw in question_lower for kw in ['partner', 'collaboration', 'distributor', 'training', 'warranty', 'support']):
-            categories['partnership'].append(qa)
-        elif any(kw in question_lower for kw in ['contact', 'email', 'call', 'visit', 'response time', 'help']):
-            categories['contact'].append(qa)
-    
-    # Build example text with diverse representation (max 2 per category)
-    example_text = "\n\nKNOWLEDGE BASE EXAMPLES (Base your answers on these):\n\n"
-    
-    for category_name, qas in categories.items():
-        if qas:
-            example_text += f"--- {category_name.upper()} ---\n"
-            for qa in qas[:2]:  # Limit to 2 examples per category
-                example_text += f"Q: {qa['question']}\nA: {qa['answer']}\n\n"
-    
-    if lang == 'th':
-        return f"""คุณคือ CMSbot ผู้ช่วย AI เชี่ยวชาญของ Civil Master Solution (CMS) บริษัทไทยผู้นำด้าน Steel Fiber Reinforced Concrete (SFRC)
-
-🎯 ความเชี่ยวชาญหลัก:
-• ผลิตภัณฑ์: DÚCTIL® Steel Fiber (1100-2000 MPa), Micro Steel Fiber (2000-2800 MPa), Synthetic Fiber (PP, PAN), Armour Joint®
-• โซลูชัน: พื้นอุตสาหกรรม, ทางเท้า, คอนกรีตสำเร็จรูป, ระบบ PEB
-• มาตรฐาน: EN 14889, ACI 360, TR34, AISC
-• ความสำเร็จ: 120+ โครงการ, 1,500,000 ตร.ม. พื้น SFRC ในประเทศไทย
-
-📋 วิธีการตอบ (สำคัญมาก - ต้องปฏิบัติตาม):
-1. ✅ ตอบตรงประเด็นในประโยคแรก - ไม่เกริ่นนำ ไม่อ้อมค้อม
-2. ✅ เพิ่มรายละเอียดสนับสนุน 1-2 ประโยค:
-   - ข้อดีเฉพาะ (ความแข็งแรง, ความทนทาน, ประหยัดต้นทุน)
-   - มาตรฐาน/การรับรอง (EN, ACI, TR34)
-   - ตัวอย่างการใช้งานจริง (โกดัง, โลจิสติกส์, โรงงาน)
-3. ✅ รวมทั้งหมด 2-3 ประโยค - กระชับแต่สมบูรณ์
-4. ✅ ใช้เฉพาะข้อมูลจาก KNOWLEDGE BASE ด้านล่าง - ห้ามแต่งข้อมูลเด็ดขาด
-5. ✅ ใช้คำศัพท์เทคนิคที่เหมาะสม - สำหรับวิศวกรและผู้เชี่ยวชาญ
-6. ❌ ห้ามใช้คำว่า "ประมาณ" "อาจจะ" "น่าจะ" - ถ้าไม่แน่ใจให้แนะนำติดต่อทีมงาน
-7. ❌ ห้ามเขียนยาว - เน้นคุณค่าหลักและประโยชน์ที่ชัดเจน
-8. ✅ สำหรับคำถามที่ซับซ้อน - อธิบายสั้นๆ แล้วแนะนำติดต่อ email เฉพาะทาง
-
-🏆 หัวข้อที่ครอบคลุม:
-• ข้อมูลผลิตภัณฑ์และข้อได้เปรียบ (DÚCTIL®, Armour Joint®, Micro/Synthetic Fibers)
-• การเปรียบเทียบต้นทุน SFRC vs เหล็กเสริมแบบดั้งเดิม
-• มาตรฐานสากลและการรับรองคุณภาพ (EN 14889, ACI 360, TR34)
-• โครงการจริง: โกดัง 80,000 ตร.ม., ศูนย์โลจิสติกส์, พื้นรับน้ำหนักสูง
-• บริการเทคนิค: การออกแบบ, กำกับงาน, ทดสอบ, การฝึกอบรม
-• กลยุทธ์ประหยัดต้นทุนและ Value Engineering
-• ความร่วมมือและการเป็นพันธมิตร (B2B, ตัวแทนจำหน่าย)
-
-📞 ข้อมูลติดต่อ:
-• ทั่วไป: cms@civilmastersolution.com
-• เทคนิค: narongkorn.m@civilmastersolution.com, yanapol@civilmastersolution.com
-• เว็บไซต์: www.civilmastersolution.com
-• เวลาตอบกลับ: 1-2 วันทำการ (โทรสำหรับเร่งด่วน)
-
-🌍 การส่งออกและโครงการสากล:
-CMS เน้นตลาดไทยแต่รองรับโครงการ ASEAN ผ่านพันธมิตรการส่งออก ติดต่อ narongkorn.m@civilmastersolution.com สำหรับการส่งออกและความร่วมมือระหว่างประเทศ
-{example_text}
-⚠️ สำคัญ: ใช้เฉพาะข้อมูลจาก KNOWLEDGE BASE ด้านบน หากคำถามอยู่นอกขอบเขต ให้แนะนำติดต่อทีมงานโดยตรงพร้อมอธิบายว่าทำไมควรปรึกษาโดยตรง"""
-    
-    else:  # English
-        return f"""You are CMSbot, the AI expert assistant for Civil Master Solution (CMS), Thailand's leading Steel Fiber Reinforced Concrete (SFRC) solutions provider.
-
-🎯 CORE EXPERTISE:
-• Products: DÚCTIL® Steel Fiber (1100-2000 MPa), Micro Steel Fiber (2000-2800 MPa), Synthetic Fiber (PP, PAN), Armour Joint®
-• Solutions: Industrial Flooring, Pavements, Precast Concrete, PEB Systems
-• Standards: EN 14889, ACI 360, TR34, AISC
-• Track Record: 120+ projects, 1,500,000 m² SFRC flooring completed in Thailand
-
-📋 RESPONSE GUIDELINES (CRITICAL - Must Follow):
-1. ✅ Answer directly in first sentence - no introductions, no fluff
-2. ✅ Add 1-2 supporting sentences with:
-   - Specific benefits (strength, durability, cost savings)
-   - Standards/certifications (EN, ACI, TR34)
-   - Real-world applications (warehouses, logistics, factories)
-3. ✅ Total 2-3 sentences - concise but complete
-4. ✅ Use ONLY information from KNOWLEDGE BASE below - never fabricate data
-5. ✅ Use appropriate technical terminology - for engineers and professionals
-6. ❌ Avoid vague terms like "approximately" "maybe" "possibly" - if uncertain, direct to team
-7. ❌ Don't write long paragraphs - focus on core value and clear benefits
-8. ✅ For complex inquiries - explain briefly then recommend specific email contact
-
-🏆 KEY TOPICS COVERED:
-• Product information and advantages (DÚCTIL®, Armour Joint®, Micro/Synthetic Fibers)
-• Cost comparison: SFRC vs traditional rebar systems
-• International standards and quality certifications (EN 14889, ACI 360, TR34)
-• Real projects: 80,000 m² warehouse, logistics centers, heavy-duty floors
-• Technical services: Design, supervision, testing, contractor training
-• Cost-saving strategies and Value Engineering approaches
-• Partnerships and collaboration (B2B, distributors, technical alliances)
-
-📞 CONTACT INFORMATION:
-• General: cms@civilmastersolution.com
-• Technical: narongkorn.m@civilmastersolution.com, yanapol@civilmastersolution.com
-• Website: www.civilmastersolution.com
-• Response Time: 1-2 business days (call for urgent matters)
-
-🌍 EXPORT & INTERNATIONAL PROJECTS:
-CMS focuses on Thailand but supports ASEAN regional projects through export partnerships. Contact narongkorn.m@civilmastersolution.com for export inquiries and international collaboration opportunities.
-{example_text}
-⚠️ IMPORTANT: Use ONLY information from KNOWLEDGE BASE above. If question is outside scope, recommend contacting the team directly and explain why direct consultation would be beneficial."""
-
-# Use dynamic system prompt
-system_prompt = {
-    'en': build_system_prompt('en'),
-    'th': build_system_prompt('th')
-}
+def categorize_question(question):
+    """Topic of a Q&A question from CATEGORY_KEYWORDS, or '' if none matches"""
+    question_lower = question.lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(kw in question_lower for kw in keywords):
+            return category
+    return ''
+
+# Instructions heading every Gemini prompt, followed by the retrieved Q&A pairs (see build_gemini_prompt)
+RAG_PROMPT_HEADER = {
+    'en': """You are CMSbot, the AI assistant for Civil Master Solution (CMS), Thailand's leading Steel Fiber Reinforced Concrete (SFRC) provider: DÚCTIL® Steel Fiber (1100-2000 MPa), Micro Steel Fiber (2000-2800 MPa), Synthetic Fiber (PP, PAN) and Armour Joint®; standards EN 14889, ACI 360, TR34; 120+ projects in Thailand.
 
+Rules: answer directly in the first sentence, 2-3 sentences in total, for engineers and professionals. Use ONLY the KNOWLEDGE BASE below and never invent data. If it does not cover the question, say so briefly and recommend cms@civilmastersolution.com (technical/export: narongkorn.m@civilmastersolution.com).""",
+    'th': """คุณคือ CMSbot ผู้ช่วย AI ของ Civil Master Solution (CMS) บริษัทไทยผู้นำด้าน Steel Fiber Reinforced Concrete (SFRC): DÚCTIL® Steel Fiber (1100-2000 MPa), Micro Steel Fiber (2000-2800 MPa), Synthetic Fiber (PP, PAN) และ Armour Joint® มาตรฐาน EN 14889, ACI 360, TR34 และ 120+ โครงการในประเทศไทย
+
+กฎ: ตอบตรงประเด็นในประโยคแรก รวม 2-3 ประโยค สำหรับวิศวกรและผู้เชี่ยวชาญ ใช้เฉพาะข้อมูลจาก KNOWLEDGE BASE ด้านล่าง ห้ามแต่งข้อมูล หากไม่มีข้อมูล ให้แจ้งสั้นๆ และแนะนำติดต่อ cms@civilmastersolution.com (เทคนิค/ส่งออก: narongkorn.m@civilmastersolution.com)""",
+}
 
-def get_month_key():
-    today = timezone.now().date()
-    return f"monthly_spend_{today.year}_{today.month}"
+spend_tracker = SpendTracker(MONTHLY_BUDGET, INPUT_PRICE_PER_1K, OUTPUT_PRICE_PER_1K, ALERT_EMAIL)
 
-def estimate_cost():
-    return (50 / 1000.0) * INPUT_PRICE_PER_1K + (50 / 1000.0) * OUTPUT_PRICE_PER_1K
+def is_over_budget():
+    try:
+        return spend_tracker.is_over_budget()
+    except Exception as e:
+        logger.error(f"Budget check failed: {e}")
+        return False
 
-def record_cost_and_check_limit():
-    month_key = get_month_key()
-    current_spend = cache.get(month_key, 0.0)
-    cost = estimate_cost()
-    new_spend = current_spend + cost
-    cache.set(month_key, new_spend, 2592000)
-    if new_spend >= MONTHLY_BUDGET and ALERT_EMAIL:
-        send_mail('Chatbot Monthly Budget Exceeded', f'Budget of ${MONTHLY_BUDGET} reached. Current spend: ${new_spend:.6f}', settings.DEFAULT_FROM_EMAIL, [ALERT_EMAIL], fail_silently=True)
-    return new_spend >= MONTHLY_BUDGET
+# Token counts of the last Gemini call in this request (read by the views for event logging)
+last_usage = contextvars.ContextVar('chatbot_last_usage', default=None)
 
-def load_qa_data():
+def record_usage(response):
+    """Charge one Gemini call to the monthly budget using the token counts it reports"""
+    usage = getattr(response, 'usage_metadata', None)
+    if not usage:
+        logger.warning("Gemini response has no usage metadata; spend not recorded")
+        return
+    last_usage.set((usage.prompt_token_count, usage.candidates_token_count))
+    metrics.incr('gemini_input_tokens', usage.prompt_token_count)
+    metrics.incr('gemini_output_tokens', usage.candidates_token_count)
     try:
-        with open(os.path.join(os.path.dirname(__file__), 'qachatbot_data.json'), 'r', encoding='utf-8') as f:
-            return json.load(f)['qa_pairs']
-    except (FileNotFoundError, json.JSONDecodeError):
-        return [{"question": "Error", "answer": "Q&A file not found or invalid.", "lang": "en"}]
+        spend_tracker.record(usage.prompt_token_count, usage.candidates_token_count)
+    except Exception as e:
+        logger.error(f"Recording Gemini spend failed: {e}")
+
+def get_response_cache_key(user_question, lang):
+    """Stable response-cache key for a question in the current knowledge-base version"""
+    knowledge_base.refresh()
+    return response_cache_key(user_question, lang, knowledge_base.version)
 
 def detect_language(text):
     return 'th' if any('\u0E00' <= char <= '\u0E7F' for char in text) else 'en'
@@ -253,6 +234,25 @@ def initialize_session(request, current_time):
         request.session['question_timestamps'] = []
         request.session['chat_count'] = 0
         request.session['last_activity'] = current_time
+    if 'conversation_id' not in request.session:
+        request.session['conversation_id'] = uuid.uuid4().hex
+
+def append_exchange(request, question, answer):
+    """Add one exchange to the capped session history; returns it with its sequence number"""
+    exchange = {'question': question, 'answer': answer, 'seq': request.session['chat_count']}
+    request.session['chat_history'] = (request.session['chat_history'] + [exchange])[-MAX_HISTORY_TURNS:]
+    request.session.modified = True
+    return exchange
+
+async def ainitialize_session(request, current_time):
+    """Async counterpart of initialize_session (loads the session without blocking the event loop)"""
+    defaults = {'chat_history': [], 'question_timestamps': [], 'last_activity': current_time, 'chat_count': 0, 'conversation_id': uuid.uuid4().hex}
+    for key, value in defaults.items():
+        await request.session.asetdefault(key, value)
+    if current_time - await request.session.aget('last_activity') > 3600:
+        await request.session.aflush()
+        defaults['last_activity'] = current_time
+        await request.session.aupdate(defaults)
 
 def validate_input(request, ip):
     try:
@@ -263,59 +263,187 @@ def validate_input(request, ip):
         return {'error': 'Invalid JSON'}, None, None
     if honeypot.strip():
         logger.warning(f"Honeypot triggered by IP {ip}")
+        chat_events.emit('honeypot', ip=ip, question=user_question[:2000], conversation_id=request.session.get('conversation_id', ''))
         return {'error': 'Spam detected'}, None, None
     if not user_question:
         return {'error': 'No question provided'}, None, None
     if count_words(user_question) > MAX_WORDS_PER_QUESTION:
+        chat_events.emit('rejected', ip=ip, tier='too_long', question=user_question[:2000], conversation_id=request.session.get('conversation_id', ''))
         return {'error': f'Question too long (max {MAX_WORDS_PER_QUESTION} words)'}, None, None
     return None, user_question, detect_language(user_question)
 
-def find_match(user_question, lang_qa):
-    """Find exact or semantic match in Q&A pairs."""
+def get_embedding_model():
+    """Load the embedding model of EMBEDDING_BACKEND once per process (lazy loading)."""
     global model
-    
-    # Check for exact match first (fastest)
-    for pair in lang_qa:
-        if pair.get('question', '').lower().strip() == user_question.lower().strip():
-            return pair['answer']
-    
-    # Semantic matching with sentence transformers (if available)
-    if not SENTENCE_TRANSFORMERS_AVAILABLE:
-        # Skip semantic matching if not available
-        return None
-    
-    best_match = None
-    best_ratio = 0
-    
-    # Load model only once (lazy loading)
     if model is None:
         try:
-            model = sentence_transformers.SentenceTransformer('all-MiniLM-L6-v2')
+            model = load_model(
+                EMBEDDING_BACKEND,
+                EMBEDDING_MODEL_NAME,
+                onnx_model_dir=getattr(settings, 'CHATBOT_ONNX_MODEL_DIR', None),
+                threads=getattr(settings, 'CHATBOT_EMBEDDING_THREADS', None),
+            )
         except Exception as e:
-            logging.error(f"Failed to load sentence transformer model: {e}")
+            logging.error(f"Failed to load {EMBEDDING_BACKEND} embedding model: {e}")
             return None
-    
+    return model
+
+semantic_index = SemanticIndex(knowledge_base, get_embedding_model, EMBEDDING_MODEL_ID) if EMBEDDINGS_AVAILABLE else None
+
+def embed_question(text):
+    return get_embedding_model().encode(text, convert_to_numpy=True, normalize_embeddings=True)
+
+def encode_questions(questions):
+    """Normalized float32 embeddings for stored Q&A questions; returns (matrix or None, model name)"""
+    if not EMBEDDINGS_AVAILABLE or get_embedding_model() is None:
+        return None, ''
+    vectors = get_embedding_model().encode(list(questions), batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+    return vectors.astype('float32'), EMBEDDING_MODEL_ID
+
+# Recent Gemini answers, reused when a new question is a near-duplicate of one already answered
+recent_answers = SemanticResponseCache(
+    threshold=getattr(settings, 'CHATBOT_SEMANTIC_CACHE_THRESHOLD', 0.93),
+    lexical_threshold=getattr(settings, 'CHATBOT_SEMANTIC_CACHE_LEXICAL_THRESHOLD', 0.97),
+    max_entries=getattr(settings, 'CHATBOT_SEMANTIC_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', 3600),
+    embed=embed_question if EMBEDDINGS_AVAILABLE else None,
+)
+
+def find_recent_answer(user_question, lang):
+    """Answer from a recently generated Gemini reply to a near-identical question"""
     try:
-        user_embedding = model.encode(user_question)
-        
-        for pair in lang_qa:
-            pair_embedding = model.encode(pair.get('question', ''))
-            similarity = sentence_transformers.util.cos_sim(user_embedding, pair_embedding).item()
-            
-            if similarity > best_ratio and similarity > 0.8:  # 80% similarity threshold
-                best_match = pair
-                best_ratio = similarity
-        
-        return best_match['answer'] if best_match else None
+        return recent_answers.lookup(user_question, lang, knowledge_base.version)
     except Exception as e:
-        logging.error(f"Semantic matching failed: {e}")
+        logger.error(f"Semantic response cache lookup failed: {e}")
         return None
 
-def generate_gemini_response(user_question, lang_qa, data_lang, lang, request):
-    """Generate response using Gemini with dynamic system prompt"""
+def remember_answer(user_question, lang, answer):
+    """Index a successful Gemini answer for near-duplicate reuse"""
+    if is_fallback_response(answer):
+        return
+    try:
+        recent_answers.add(user_question, lang, knowledge_base.version, answer)
+    except Exception as e:
+        logger.error(f"Semantic response cache add failed: {e}")
+
+def is_fallback_response(answer):
+    """True for the canned error/busy/degraded replies, which must never be cached"""
+    return (
+        not answer
+        or answer in (GEMINI_ERROR_RESPONSE, BUDGET_EXCEEDED_RESPONSE)
+        or answer in BUSY_RESPONSE.values()
+        or answer in DEGRADED_RESPONSE.values()
+        or answer.startswith(tuple(DEGRADED_PREFIX.values()))
+    )
+
+def find_match(user_question, lang=None):
+    """Find exact, lexical or semantic match in Q&A pairs."""
+    return match_question(user_question, lang)[0]
+
+def compose_suggestion(ranked, lang):
+    """Answer built locally from the closest Q&A pairs, headed by a "did you mean" hint"""
+    pairs = [pair for _, pair in ranked]
+    if len(pairs) == 1:
+        hint = SUGGESTION_HINT[lang]['one'].format(question=pairs[0]['question'].rstrip('?？ '))
+        return f"{hint}\n\n{pairs[0]['answer']}"
+    parts = [SUGGESTION_HINT[lang]['many']]
+    parts += [f"\"{pair['question']}\"\n{pair['answer']}" for pair in pairs]
+    return "\n\n".join(parts)
+
+def match_question(user_question, lang=None):
+    """Resolve a question without Gemini; returns (answer, tier) or (None, None)
+
+    Tiers, cheapest first: 'exact' (normalized hash), 'lexical' / 'semantic'
+    (one pair above the high threshold), 'suggested' (the top pairs above the
+    medium threshold, composed with a "did you mean" hint). Each is counted
+    in metrics as match_<tier>; match_miss counts questions no Q&A pair answered.
+    """
+    lang = lang or detect_language(user_question)
+    
+    # Check for exact match first (fastest): normalized hash lookup
+    exact = knowledge_base.exact_answer(user_question, lang)
+    if exact:
+        metrics.incr('match_exact')
+        return exact, 'exact'
+    
+    # Lexical BM25 matching over character n-grams (sub-millisecond, no model needed)
+    try:
+        lexical = lexical_index.top_k(user_question, lang, SUGGEST_TOP_K)
+    except Exception as e:
+        logger.error(f"Lexical matching failed: {e}")
+        lexical = []
+    if lexical and lexical[0][0] >= LEXICAL_MATCH_THRESHOLD:
+        metrics.incr('match_lexical')
+        return lexical[0][1]['answer'], 'lexical'
+    
+    # Semantic matching with the embedding backend (if available)
+    semantic = []
+    if EMBEDDINGS_AVAILABLE:
+        try:
+            semantic = semantic_index.top_k(user_question, lang, SUGGEST_TOP_K)
+        except Exception as e:
+            logging.error(f"Semantic matching failed: {e}")
+        if semantic and semantic[0][0] > SEMANTIC_MATCH_THRESHOLD:
+            metrics.incr('match_semantic')
+            return semantic[0][1]['answer'], 'semantic'
     
-    # Build prompt with system prompt from build_system_prompt()
-    prompt = system_prompt[lang] + "\n\n"
+    # Medium confidence: let the user pick from the closest pairs instead of paying for Gemini
+    if semantic:
+        suggestions = [(score, pair) for score, pair in semantic if score >= SEMANTIC_SUGGEST_THRESHOLD]
+    else:
+        suggestions = [(score, pair) for score, pair in lexical if score >= LEXICAL_SUGGEST_THRESHOLD]
+    if suggestions:
+        metrics.incr('match_suggested')
+        return compose_suggestion(suggestions, lang), 'suggested'
+    metrics.incr('match_miss')
+    return None, None
+
+def estimate_tokens(text):
+    """Rough Gemini token count: ~4 Latin characters or ~2 Thai/other characters per token"""
+    ascii_chars = sum(1 for char in text if char < '\x80')
+    return int(ascii_chars / 4 + (len(text) - ascii_chars) / 2) + 1
+
+context_compactor = ContextCompactor(
+    estimate_tokens,
+    token_budget=getattr(settings, 'CHATBOT_CONTEXT_TOKEN_BUDGET', 200),
+    recent_turns=getattr(settings, 'CHATBOT_CONTEXT_RECENT_TURNS', 1),
+)
+
+def retrieve_qa_pairs(user_question, lang, k=None, min_scores=(RAG_MIN_SEMANTIC_SCORE, RAG_MIN_LEXICAL_SCORE)):
+    """Top-k Q&A pairs most relevant to the question (semantic if available, else lexical BM25)
+
+    `min_scores` is the (semantic, lexical) score a pair needs; the default is
+    the low floor for prompt context.
+    """
+    k = k or RAG_TOP_K
+    try:
+        if EMBEDDINGS_AVAILABLE:
+            ranked = semantic_index.top_k(user_question, lang, k)
+            min_score = min_scores[0]
+        else:
+            ranked = lexical_index.top_k(user_question, lang, k)
+            min_score = min_scores[1]
+    except Exception as e:
+        logger.error(f"Q&A retrieval failed: {e}")
+        return []
+    return [pair for score, pair in ranked if score >= min_score]
+
+def degraded_response(user_question, lang):
+    """Answer without Gemini while its circuit breaker is open: best Q&A answer if one is relevant
+
+    The pair must reach the "did you mean" threshold; the prompt-context floor
+    lets unrelated answers through for off-topic questions.
+    """
+    metrics.incr('gemini_degraded_answers')
+    relevant_qa = retrieve_qa_pairs(user_question, lang, k=1, min_scores=(SEMANTIC_SUGGEST_THRESHOLD, LEXICAL_SUGGEST_THRESHOLD))
+    if relevant_qa:
+        return DEGRADED_PREFIX[lang] + relevant_qa[0]['answer']
+    return DEGRADED_RESPONSE[lang]
+
+def build_gemini_prompt(user_question, data_lang, lang, chat_history):
+    """Build a short Gemini prompt around the Q&A pairs retrieved for this question"""
+    relevant_qa = retrieve_qa_pairs(user_question, lang)
+    prompt = RAG_PROMPT_HEADER[lang] + "\n\n"
     
     # Add company context
     prompt += f"Company: {data_lang['name']}\n"
@@ -323,23 +451,137 @@ def generate_gemini_response(user_question, lang_qa, data_lang, lang, request):
     prompt += f"Core Services: {', '.join(data_lang['services'])}\n"
     prompt += f"Main Products: {', '.join(data_lang['products'])}\n\n"
     
-    # Add recent conversation context (last 3 exchanges)
-    chat_history = request.session.get('chat_history', [])
-    if chat_history:
-        prompt += "RECENT CONVERSATION CONTEXT:\n"
-        for item in chat_history[-3:]:
-            prompt += f"User: {item['question']}\nCMSbot: {item['answer']}\n\n"
+    # Add conversation context: the last exchange in full, older ones as a summary, within its token budget
+    context = context_compactor.render(chat_history)
+    if context:
+        metrics.observe('gemini_context_tokens', estimate_tokens(context))
     
     # Add current question
-    prompt += f"\nCURRENT USER QUESTION: {user_question}\n\n"
-    prompt += "CMSbot Response (2-3 sentences, based on KNOWLEDGE BASE):"
+    question = f"\nCURRENT USER QUESTION: {user_question}\n\n"
+    question += "CMSbot Response (2-3 sentences, based on KNOWLEDGE BASE):"
     
-    # Call Gemini API with error handling
-    with api_lock:
-        try:
-            model = genai.GenerativeModel('gemini-2.0-flash-lite')
-            response = model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"Gemini API error: {str(e)}")
-            return 'Service temporarily unavailable. Please contact cms@civilmastersolution.com or try again later.'
\ No newline at end of file
+    # Add retrieved Q&A pairs, most relevant first, until the token budget is used up
+    if relevant_qa:
+        budget = PROMPT_TOKEN_BUDGET - estimate_tokens(prompt + context + question)
+        knowledge = "KNOWLEDGE BASE (most relevant Q&A):\n"
+        for i, qa in enumerate(relevant_qa):
+            example = f"Q: {qa['question']}\nA: {qa['answer']}\n\n"
+            cost = estimate_tokens(example)
+            if i > 0 and cost > budget:
+                break
+            knowledge += example
+            budget -= cost
+        prompt += knowledge
+    else:
+        # Off-topic or unknown: the header's rule sends the user to the team, so no examples are needed
+        prompt += "KNOWLEDGE BASE: no Q&A pair matches this question.\n\n"
+    
+    prompt += context + question
+    metrics.observe('gemini_prompt_tokens', estimate_tokens(prompt))
+    return prompt
+
+def generate_gemini_response(user_question, data_lang, lang, chat_history=()):
+    """Generate response using Gemini with a prompt built around the retrieved Q&A pairs"""
+    if is_over_budget():
+        return BUDGET_EXCEEDED_RESPONSE
+    prompt = build_gemini_prompt(user_question, data_lang, lang, chat_history)
+    
+    # Call Gemini API through the shared pool (bounded concurrency) with error handling
+    try:
+        response = gemini_pool.generate(prompt)
+        record_usage(response)
+        return response.text.strip()
+    except CircuitOpenError:
+        return degraded_response(user_question, lang)
+    except GeminiBusyError as e:
+        logger.warning(f"Gemini pool busy: {e}")
+        return BUSY_RESPONSE[lang]
+    except Exception as e:
+        logger.error(f"Gemini API error: {str(e)}")
+        metrics.incr('gemini_errors')
+        return GEMINI_ERROR_RESPONSE
+
+async def agenerate_gemini_response(user_question, data_lang, lang, chat_history):
+    """Async generate_gemini_response: awaits Gemini without holding a worker thread"""
+    if await sync_to_async(is_over_budget)():
+        return BUDGET_EXCEEDED_RESPONSE
+    # Retrieval encodes the question and may reload the knowledge base: keep it off the event loop
+    prompt = await sync_to_async(build_gemini_prompt, thread_sensitive=False)(user_question, data_lang, lang, chat_history)
+    try:
+        response = await gemini_pool.agenerate(prompt)
+        await sync_to_async(record_usage)(response)
+        return response.text.strip()
+    except CircuitOpenError:
+        return await sync_to_async(degraded_response, thread_sensitive=False)(user_question, lang)
+    except GeminiBusyError as e:
+        logger.warning(f"Gemini pool busy: {e}")
+        return BUSY_RESPONSE[lang]
+    except Exception as e:
+        logger.error(f"Gemini API error: {str(e)}")
+        metrics.incr('gemini_errors')
+        return GEMINI_ERROR_RESPONSE
+
+class GeminiStreamInterrupted(Exception):
+    """Gemini failed after part of a streamed answer was sent; `fallback` replaces what the client got."""
+
+    def __init__(self, fallback):
+        super().__init__(fallback)
+        self.fallback = fallback
+
+def stream_gemini_response(user_question, data_lang, lang, chat_history):
+    """Yield Gemini's answer as text chunks while it is being generated
+
+    A failure before the first chunk yields the canned reply as the only
+    chunk; a failure after it raises GeminiStreamInterrupted, so the partial
+    answer is never mistaken for a complete one.
+    """
+    if is_over_budget():
+        yield BUDGET_EXCEEDED_RESPONSE
+        return
+    prompt = build_gemini_prompt(user_question, data_lang, lang, chat_history)
+    sent = False
+    try:
+        chunk = None
+        for chunk in gemini_pool.generate_stream(prompt):
+            if chunk.text:
+                sent = True
+                yield chunk.text
+        # The final chunk carries the usage totals for the whole stream
+        record_usage(chunk)
+    except CircuitOpenError:
+        yield degraded_response(user_question, lang)
+    except GeminiBusyError as e:
+        logger.warning(f"Gemini pool busy: {e}")
+        yield BUSY_RESPONSE[lang]
+    except Exception as e:
+        logger.error(f"Gemini API streaming error: {str(e)}")
+        metrics.incr('gemini_errors')
+        if sent:
+            raise GeminiStreamInterrupted(GEMINI_ERROR_RESPONSE) from e
+        yield GEMINI_ERROR_RESPONSE
+
+async def astream_gemini_response(user_question, data_lang, lang, chat_history):
+    """Async stream_gemini_response: chunks are awaited without holding a worker thread"""
+    if await sync_to_async(is_over_budget)():
+        yield BUDGET_EXCEEDED_RESPONSE
+        return
+    prompt = await sync_to_async(build_gemini_prompt, thread_sensitive=False)(user_question, data_lang, lang, chat_history)
+    sent = False
+    try:
+        chunk = None
+        async for chunk in gemini_pool.agenerate_stream(prompt):
+            if chunk.text:
+                sent = True
+                yield chunk.text
+        await sync_to_async(record_usage)(chunk)
+    except CircuitOpenError:
+        yield await sync_to_async(degraded_response, thread_sensitive=False)(user_question, lang)
+    except GeminiBusyError as e:
+        logger.warning(f"Gemini pool busy: {e}")
+        yield BUSY_RESPONSE[lang]
+    except Exception as e:
+        logger.error(f"Gemini API streaming error: {str(e)}")
+        metrics.incr('gemini_errors')
+        if sent:
+            raise GeminiStreamInterrupted(GEMINI_ERROR_RESPONSE) from e
+        yield GEMINI_ERROR_RESPONSE
@@ -0,0 +1,98 @@
+import time
+import threading
+import logging
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Per-process circuit breaker around the Gemini API.
+
+    Errors, timeouts and calls slower than `slow_call_ms` count as failures.
+    After `failure_threshold` consecutive failures the breaker opens and every
+    call is refused at once for `reset_timeout` seconds; then one probe call is
+    let through (half-open) and its result closes or re-opens the breaker.
+    """
+
+    def __init__(self, name, failure_threshold=5, slow_call_ms=10000, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_ms = slow_call_ms
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._trips = 0
+        self._last_failure = ''
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+        metrics.incr(f'{self.name}_breaker_rejected')
+        raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def record_success(self, latency_ms):
+        if latency_ms > self.slow_call_ms:
+            self.record_failure(f"slow call ({latency_ms:.0f}ms)")
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"{self.name} circuit breaker closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, reason=''):
+        with self._lock:
+            self._failures += 1
+            self._last_failure = reason
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                tripped = True
+            else:
+                tripped = False
+        if tripped:
+            metrics.incr(f'{self.name}_breaker_trips')
+            logger.warning(f"{self.name} circuit breaker opened for {self.reset_timeout}s after {self._failures} failures: {reason}")
+
+    def cancel(self):
+        """The allowed call ended without telling whether Gemini is healthy; let the next one probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'trips': self._trips,
+                'retry_in_s': retry_in,
+                'last_failure': self._last_failure,
+                'failure_threshold': self.failure_threshold,
+                'slow_call_ms': self.slow_call_ms,
+                'reset_timeout_s': self.reset_timeout,
+            }
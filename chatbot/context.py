@@ -0,0 +1,74 @@
+import re
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def _clip(text, max_chars):
+    text = ' '.join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + '…'
+
+
+def first_sentence(text, max_chars=160):
+    """Leading sentence of `text` (answers put the key fact first), clipped to `max_chars`."""
+    return _clip(_SENTENCE_END.split(text.strip(), 1)[0], max_chars)
+
+
+class ContextCompactor:
+    """Conversation context for the Gemini prompt within a fixed token budget.
+
+    The last `recent_turns` exchanges (0: none) are kept in full (clipped to
+    `recent_share` of the budget); older ones become one extractive summary
+    line each (the question and the first sentence of the answer). Lines are
+    added newest first until `token_budget` is used up, so
+    the context stops growing after a few turns and a long chat costs about
+    the same per turn as a short one.
+    """
+
+    def __init__(self, estimate_tokens, token_budget=200, recent_turns=1, recent_share=0.6):
+        self.estimate_tokens = estimate_tokens
+        self.token_budget = token_budget
+        if recent_turns < 0:
+            raise ValueError('recent_turns must be 0 or more')
+        self.recent_turns = recent_turns
+        self.recent_share = recent_share
+
+    def summary_line(self, exchange):
+        return f"- User asked: {_clip(exchange['question'], 120)} | CMSbot: {first_sentence(exchange['answer'])}\n"
+
+    def _recent(self, exchange, budget):
+        text = f"User: {exchange['question']}\nCMSbot: {exchange['answer']}\n\n"
+        if self.estimate_tokens(text) <= budget:
+            return text
+        # Too long for the budget: keep the question and the start of the answer
+        answer = exchange['answer']
+        while len(answer) > 40 and self.estimate_tokens(text) > budget:
+            answer = _clip(answer, int(len(answer) * 0.75))
+            text = f"User: {_clip(exchange['question'], 200)}\nCMSbot: {answer}\n\n"
+        return text
+
+    def render(self, chat_history):
+        """Context block for the prompt (empty string for a new conversation)."""
+        if not chat_history or self.token_budget <= 0:
+            return ''
+        chat_history = list(chat_history)
+        # Not history[-n:]: with recent_turns=0 that would keep every turn in full
+        split = max(len(chat_history) - self.recent_turns, 0)
+        older, recent = chat_history[:split], chat_history[split:]
+        recent_header = "RECENT CONVERSATION CONTEXT:\n" if recent else ''
+        recent_budget = int(self.token_budget * self.recent_share) - self.estimate_tokens(recent_header)
+        recent_text = ''
+        for exchange in reversed(recent):
+            text = self._recent(exchange, recent_budget)
+            recent_budget -= self.estimate_tokens(text)
+            recent_text = text + recent_text
+        summary_header = "EARLIER IN THIS CONVERSATION (summary):\n"
+        budget = self.token_budget - self.estimate_tokens(recent_header + recent_text + summary_header)
+        summary = ''
+        for exchange in reversed(older):
+            line = self.summary_line(exchange)
+            cost = self.estimate_tokens(line)
+            if cost > budget:
+                break
+            summary = line + summary
+            budget -= cost
+        return (summary_header + summary + "\n" if summary else '') + recent_header + recent_text
@@ -0,0 +1,109 @@
+import os
+import time
+import logging
+import importlib.util
+
+logger = logging.getLogger(__name__)
+
+# Backends in the order CHATBOT_EMBEDDING_BACKEND=auto tries them
+BACKENDS = ('onnx', 'sentence-transformers')
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_TOKENIZER_FILE = 'tokenizer.json'
+
+
+def _installed(*modules):
+    # find_spec does not import, so checking is cheap even for torch-based packages
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+
+def backend_available(name, onnx_model_dir=None):
+    if name == 'onnx':
+        return (
+            _installed('onnxruntime', 'tokenizers', 'numpy')
+            and bool(onnx_model_dir)
+            and os.path.exists(os.path.join(onnx_model_dir, ONNX_MODEL_FILE))
+            and os.path.exists(os.path.join(onnx_model_dir, ONNX_TOKENIZER_FILE))
+        )
+    if name == 'sentence-transformers':
+        return _installed('sentence_transformers')
+    return False
+
+
+def select_backend(preferred='auto', onnx_model_dir=None):
+    """Name of the embedding backend to use, or None when semantic matching is unavailable."""
+    candidates = BACKENDS if preferred == 'auto' else (preferred,)
+    for name in candidates:
+        if backend_available(name, onnx_model_dir):
+            return name
+    return None
+
+
+def model_id(backend, model_name):
+    """Identifies the vectors a backend produces (stored as QAPair.embedding_model)."""
+    return f'{model_name}-onnx-int8' if backend == 'onnx' else model_name
+
+
+def load_model(backend, model_name, onnx_model_dir=None, threads=None):
+    """Build the encoder for `backend`; both expose the SentenceTransformer.encode() subset the chatbot uses."""
+    started = time.perf_counter()
+    if backend == 'onnx':
+        model = OnnxEmbeddingModel(onnx_model_dir, threads=threads)
+    elif backend == 'sentence-transformers':
+        import sentence_transformers
+        model = sentence_transformers.SentenceTransformer(model_name)
+    else:
+        raise ValueError(f"Unknown embedding backend {backend!r}")
+    logger.info(f"Loaded {backend} embedding model {model_id(backend, model_name)} in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return model
+
+
+class OnnxEmbeddingModel:
+    """Sentence-transformer exported to ONNX (int8-quantized), run with onnxruntime.
+
+    Needs only onnxruntime, tokenizers and numpy instead of torch. encode()
+    matches the sentence-transformers pipeline of MiniLM models: tokenize,
+    run the encoder, mean-pool the token embeddings over the attention mask
+    and L2-normalize. Create the files with `manage.py export_onnx_embeddings`.
+    """
+
+    def __init__(self, model_dir, max_length=256, threads=None):
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self._np = np
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, ONNX_TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE), options, providers=['CPUExecutionProvider']
+        )
+        self._inputs = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        np = self._np
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._inputs:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=True, **kwargs):
+        np = self._np
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.concatenate(batches).astype(np.float32)
+        if normalize_embeddings:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
@@ -0,0 +1,124 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import ipaddress
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class EventSink:
+    """Non-blocking writer for chatbot events.
+
+    emit() only puts a dict on a bounded in-memory queue; a daemon thread
+    drains it and writes rows with bulk_create every `batch_size` events or
+    `flush_interval` seconds, so the request path never waits on the database.
+    When the queue is full (database down or too slow) events are dropped and
+    counted rather than slowing chat down. The thread is started lazily in
+    each process, so it survives gunicorn's fork.
+    """
+
+    def __init__(self, model_label, batch_size=100, flush_interval=2.0, max_queue=10000):
+        self.model_label = model_label
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'CHATBOT_EVENT_LOGGING', True)
+
+    def emit(self, kind, **fields):
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        fields['kind'] = kind
+        fields.setdefault('created_at', timezone.now())
+        if 'ip' in fields:
+            fields['ip'] = _valid_ip(fields['ip'])
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            metrics.incr('chat_events_dropped')
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='chatbot-events', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.flush)
+
+    def _take_batch(self, block):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        model = apps.get_model(self.model_label)
+        close_old_connections()
+        try:
+            model.objects.bulk_create([model(**fields) for fields in batch], batch_size=self.batch_size)
+            metrics.incr('chat_events_written', len(batch))
+        except (DatabaseError, TypeError, ValueError) as e:
+            metrics.incr('chat_events_dropped', len(batch))
+            logger.error(f"Writing {len(batch)} chat events failed: {e}")
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(block=True)
+            try:
+                self._write(batch)
+            except Exception:
+                # Anything unexpected must not end the thread: emit() would never restart it
+                metrics.incr('chat_events_dropped', len(batch))
+                logger.exception(f"Writing {len(batch)} chat events failed")
+                close_old_connections()
+
+    def flush(self):
+        """Write whatever is queued now (also called at interpreter exit)."""
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+
+def _valid_ip(value):
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return None
+
+
+chat_events = EventSink(
+    'chatbot.ChatEvent',
+    batch_size=getattr(settings, 'CHATBOT_EVENT_BATCH_SIZE', 100),
+    flush_interval=getattr(settings, 'CHATBOT_EVENT_FLUSH_INTERVAL', 2.0),
+)
@@ -0,0 +1,157 @@
+import time
+import asyncio
+import threading
+import logging
+from contextlib import contextmanager, asynccontextmanager
+
+import google.generativeai as genai
+
+from .circuit_breaker import CircuitBreaker
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiBusyError(Exception):
+    """Raised when no Gemini slot frees up within the queue timeout."""
+
+
+class GeminiPool:
+    """Shared Gemini model with a bounded number of calls in flight.
+
+    The `GenerativeModel` is built once and reused by every thread; a
+    semaphore caps concurrent `generate_content` calls so a slow reply only
+    occupies one slot instead of blocking the whole worker. Async callers
+    (ASGI mode) take slots from the same semaphore, polling it so waiting
+    never blocks the event loop, so sync and async calls share one limit.
+    Every call has a `timeout` deadline and goes through `breaker`, which
+    refuses calls with CircuitOpenError while Gemini is failing or slow.
+    """
+
+    def __init__(self, model_name, max_concurrency=4, queue_timeout=5.0, timeout=20.0, breaker=None):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker('gemini')
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def set_model(self, model):
+        """Use `model` instead of building a GenerativeModel (e.g. the load-test stub)."""
+        with self._model_lock:
+            self._model = model
+
+    def _acquire(self):
+        started = time.perf_counter()
+        acquired = self._semaphore.acquire(timeout=self.queue_timeout)
+        metrics.observe('gemini_queue_wait_ms', (time.perf_counter() - started) * 1000)
+        if not acquired:
+            metrics.incr('gemini_queue_timeouts')
+            raise GeminiBusyError(f"No Gemini slot free after {self.queue_timeout}s")
+        metrics.incr('gemini_calls')
+
+    async def _aacquire(self, poll_interval=0.05):
+        started = time.perf_counter()
+        deadline = started + self.queue_timeout
+        try:
+            while not self._semaphore.acquire(blocking=False):
+                if time.perf_counter() >= deadline:
+                    metrics.incr('gemini_queue_timeouts')
+                    raise GeminiBusyError(f"No Gemini slot free after {self.queue_timeout}s")
+                await asyncio.sleep(poll_interval)
+        finally:
+            metrics.observe('gemini_queue_wait_ms', (time.perf_counter() - started) * 1000)
+        metrics.incr('gemini_calls')
+
+    def _report(self, call, started, error=None):
+        """Tell the breaker how a call ended (`call['latency_ms']` overrides the measured time)."""
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            self.breaker.cancel()  # the client went away, which says nothing about Gemini
+        elif error is not None:
+            self.breaker.record_failure(f"{type(error).__name__}: {error}")
+        else:
+            self.breaker.record_success(call.get('latency_ms') or (time.perf_counter() - started) * 1000)
+
+    @contextmanager
+    def _slot(self):
+        """Breaker check, then a concurrency slot, for the duration of one Gemini call."""
+        self.breaker.allow()
+        try:
+            self._acquire()
+        except GeminiBusyError:
+            self.breaker.cancel()
+            raise
+        call, started = {}, time.perf_counter()
+        try:
+            yield call
+        except BaseException as e:
+            self._report(call, started, e)
+            raise
+        else:
+            self._report(call, started)
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        self.breaker.allow()
+        try:
+            await self._aacquire()
+        except GeminiBusyError:
+            self.breaker.cancel()
+            raise
+        call, started = {}, time.perf_counter()
+        try:
+            yield call
+        except BaseException as e:
+            self._report(call, started, e)
+            raise
+        else:
+            self._report(call, started)
+        finally:
+            self._semaphore.release()
+
+    def generate(self, prompt, **kwargs):
+        """Call `generate_content` once a slot is free; raises GeminiBusyError or CircuitOpenError otherwise."""
+        with self._slot():
+            return self.model.generate_content(prompt, request_options={'timeout': self.timeout}, **kwargs)
+
+    def generate_stream(self, prompt, **kwargs):
+        """Yield streamed response chunks; the slot is held until the stream ends."""
+        with self._slot() as call:
+            started = time.perf_counter()
+            for chunk in self.model.generate_content(prompt, stream=True, request_options={'timeout': self.timeout}, **kwargs):
+                # A long answer streams for a while by design; only the wait for the first chunk counts as latency
+                call.setdefault('latency_ms', (time.perf_counter() - started) * 1000)
+                yield chunk
+
+    async def agenerate(self, prompt, **kwargs):
+        """Async `generate`: awaits `generate_content_async` once a slot is free."""
+        async with self._aslot():
+            # wait_for also enforces the deadline if the client library ignores request_options
+            return await asyncio.wait_for(
+                self.model.generate_content_async(prompt, request_options={'timeout': self.timeout}, **kwargs),
+                self.timeout,
+            )
+
+    async def agenerate_stream(self, prompt, **kwargs):
+        """Async `generate_stream`: yields chunks of `generate_content_async(stream=True)`."""
+        async with self._aslot() as call:
+            started = time.perf_counter()
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt, stream=True, request_options={'timeout': self.timeout}, **kwargs),
+                self.timeout,
+            )
+            async for chunk in response:
+                call.setdefault('latency_ms', (time.perf_counter() - started) * 1000)
+                yield chunk
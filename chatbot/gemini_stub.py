@@ -0,0 +1,67 @@
+import time
+import random
+import asyncio
+
+
+class StubUsage:
+    # Zero usage: load tests never add to the real spend counters
+    prompt_token_count = 0
+    candidates_token_count = 0
+
+
+class StubResponse:
+    usage_metadata = StubUsage()
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGeminiModel:
+    """Local stand-in for `genai.GenerativeModel` used by load tests.
+
+    Answers after `latency` (+/- `jitter`) seconds and raises for `error_rate`
+    of the calls, so chatbot throughput can be measured without API spend.
+    """
+
+    def __init__(self, latency=0.8, jitter=0.2, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def _delay(self):
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _answer(self, prompt):
+        if self._random.random() < self.error_rate:
+            raise RuntimeError('Simulated Gemini error')
+        question = prompt.rsplit('CURRENT USER QUESTION:', 1)[-1].split('\n', 1)[0].strip()
+        return f"Stub answer to: {question[:80]}"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        delay = self._delay()
+        if stream:
+            return self._stream(prompt, delay)
+        time.sleep(delay)
+        return StubResponse(self._answer(prompt))
+
+    def _stream(self, prompt, delay):
+        time.sleep(delay / 2)
+        words = self._answer(prompt).split(' ')
+        for i in range(0, len(words), 4):
+            time.sleep(delay / 2 / ((len(words) + 3) // 4))
+            yield StubResponse(' '.join(words[i:i + 4]) + ' ')
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        delay = self._delay()
+        if stream:
+            return self._astream(prompt, delay)
+        await asyncio.sleep(delay)
+        return StubResponse(self._answer(prompt))
+
+    async def _astream(self, prompt, delay):
+        await asyncio.sleep(delay / 2)
+        words = self._answer(prompt).split(' ')
+        for i in range(0, len(words), 4):
+            await asyncio.sleep(delay / 2 / ((len(words) + 3) // 4))
+            yield StubResponse(' '.join(words[i:i + 4]) + ' ')
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from .normalize import normalize_question
+
+logger = logging.getLogger(__name__)
+
+_UNLOADED = object()
+
+
+class KnowledgeBase:
+    """Q&A pairs loaded once, grouped by language and reloaded on change.
+
+    Pairs come from `model` (the QAPair table) in one query when it has any,
+    otherwise from the JSON file at `path`. Once the table has rows, changes
+    to the file only take effect when they are imported into it.
+
+    The file is only stat()ed at most once per `check_interval` seconds, so the
+    request path does no file I/O and no JSON parsing while it is unchanged.
+    `version` is a digest of the file contents and is identical across workers.
+    reload() also bumps a generation counter in the shared cache, which makes
+    every other worker reload at its next check.
+    """
+
+    def __init__(self, path, check_interval=5.0, generation_key=None, model=None):
+        self.path = path
+        self.model = model
+        self.check_interval = check_interval
+        self.generation_key = generation_key
+        self._lock = threading.Lock()
+        self._stat = _UNLOADED
+        self._checked_at = float('-inf')
+        self._generation = None
+        self._listeners = []
+        self.pairs = []
+        self.by_lang = {}
+        self.exact_index = {}  # lang -> {normalized question: answer}
+        self.version = ''
+        self.source = None  # 'database' or 'file'
+        self.last_change = {'added': 0, 'changed': 0, 'removed': 0}
+
+    def add_listener(self, callback):
+        """Call `callback(knowledge_base)` after every reload that loaded new contents."""
+        self._listeners.append(callback)
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _read_db(self):
+        # Sync only: async callers reach the knowledge base through sync_to_async
+        try:
+            rows = self.model.objects.order_by('id').values_list('question', 'answer', 'lang', 'category', 'embedding', 'embedding_model')
+            return [
+                {'question': question, 'answer': answer, 'lang': lang, 'category': category,
+                 'embedding': bytes(embedding) if embedding else None, 'embedding_model': embedding_model}
+                for question, answer, lang, category, embedding, embedding_model in rows
+            ]
+        except DatabaseError as e:
+            logger.error(f"Error loading Q&A pairs from the database: {e}")
+            return []
+
+    def _read(self):
+        """Return (pairs, bytes the version is computed from, source)."""
+        if self.model is not None:
+            pairs = self._read_db()
+            if pairs:
+                digest_source = json.dumps([[pair['lang'], pair['question'], pair['answer'], pair['category']] for pair in pairs], ensure_ascii=False)
+                return pairs, digest_source.encode('utf-8'), 'database'
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        return json.loads(raw.decode('utf-8'))['qa_pairs'], raw, 'file'
+
+    def _load(self, stat):
+        try:
+            pairs, raw, source = self._read()
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading {os.path.basename(self.path)}: {e}")
+            self._stat = stat
+            return False
+        by_lang = {}
+        exact_index = {}
+        for pair in pairs:
+            lang = pair.get('lang', 'en')
+            by_lang.setdefault(lang, []).append(pair)
+            key = normalize_question(pair.get('question', ''))
+            if key:
+                exact_index.setdefault(lang, {}).setdefault(key, pair['answer'])
+        version = hashlib.sha1(raw).hexdigest()[:12]
+        if source == 'database' and self._stat not in (_UNLOADED, stat):
+            logger.warning(f"{os.path.basename(self.path)} changed, but Q&A pairs are read from the database; run `manage.py import_qa_pairs` to apply the file")
+        self._stat = stat
+        if version == self.version:
+            return False
+        self.last_change = self._diff(self.pairs, pairs)
+        self.pairs = pairs
+        self.by_lang = by_lang
+        self.exact_index = exact_index
+        self.version = version
+        self.source = source
+        logger.info(f"Loaded {len(pairs)} Q&A pairs from the {source} (version {version}; {self.last_change['added']} added, {self.last_change['changed']} changed, {self.last_change['removed']} removed)")
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Knowledge base reload listener failed: {e}")
+        return True
+
+    @staticmethod
+    def _diff(old_pairs, new_pairs):
+        def keyed(pairs):
+            return {(pair.get('lang', 'en'), pair.get('question', '')): pair.get('answer') for pair in pairs}
+        old, new = keyed(old_pairs), keyed(new_pairs)
+        return {
+            'added': sum(1 for key in new if key not in old),
+            'changed': sum(1 for key, answer in new.items() if key in old and old[key] != answer),
+            'removed': sum(1 for key in old if key not in new),
+        }
+
+    def _shared_generation(self):
+        if not self.generation_key:
+            return None
+        try:
+            return cache.get(self.generation_key)
+        except Exception as e:
+            logger.error(f"Reading knowledge base generation failed: {e}")
+            return self._generation
+
+    def refresh(self, force=False):
+        """Reload the file if it changed on disk; returns True if it was reloaded."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            if not force and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+            generation = self._shared_generation()
+            if generation != self._generation:
+                # Another worker asked for a reload
+                self._generation = generation
+                force = True
+            stat = self._file_stat()
+            if not force and stat == self._stat:
+                return False
+            return self._load(stat)
+
+    def reload(self):
+        """Reload now and make every other worker reload at its next check."""
+        if self.generation_key:
+            try:
+                cache.add(self.generation_key, 0, None)
+                self._generation = cache.incr(self.generation_key)
+            except Exception as e:
+                logger.error(f"Bumping knowledge base generation failed: {e}")
+        changed = self.refresh(force=True)
+        change = self.last_change if changed else {'added': 0, 'changed': 0, 'removed': 0}
+        return {'version': self.version, 'pairs': len(self.pairs), 'reloaded': changed, **change}
+
+    def reload_on_commit(self, using=None):
+        """Schedule reload() for when the current transaction commits, once however many rows it changed."""
+        connection = transaction.get_connection(using)
+        # run_on_commit holds (savepoint ids, callback, robust) for the open transaction. A reload
+        # registered in savepoints that are all still open can only be rolled back together with
+        # this change; one from a savepoint that has since been released or rolled back cannot stand in for it.
+        open_savepoints = set(connection.savepoint_ids)
+        if any(func == self.reload and sids <= open_savepoints for sids, func, *_ in connection.run_on_commit):
+            return
+        transaction.on_commit(self.reload, using=using)
+
+    def get_pairs(self, lang=None):
+        """Return all pairs, or the pre-grouped pairs for one language."""
+        self.refresh()
+        if lang is None:
+            return self.pairs
+        return self.by_lang.get(lang, [])
+
+    def exact_answer(self, question, lang):
+        """O(1) lookup of the answer whose normalized question equals `question`."""
+        self.refresh()
+        return self.exact_index.get(lang, {}).get(normalize_question(question))
@@ -0,0 +1,117 @@
+import math
+import threading
+import logging
+from collections import Counter
+
+from .normalize import normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+def char_ngrams(text, ngram_range=(2, 3)):
+    """Character n-grams of the normalized text; works for Thai without segmentation."""
+    text = f" {normalize_question(text)} "
+    low, high = ngram_range
+    return [text[i:i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)]
+
+
+class _LangIndex:
+    """BM25 inverted index over one language's questions."""
+
+    def __init__(self, pairs, doc_terms, k1, b, ngram_range):
+        self.pairs = pairs
+        self.k1 = k1
+        self.b = b
+        self.ngram_range = ngram_range
+        self.doc_len = [sum(terms.values()) for terms in doc_terms]
+        self.avgdl = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 1.0
+        n_docs = len(pairs)
+        df = Counter(term for terms in doc_terms for term in terms)
+        self.idf = {term: math.log(1 + (n_docs - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+        # Postings carry the precomputed BM25 weight, so a query is a plain sum
+        self.postings = {}
+        self.self_score = []
+        for doc_id, (terms, length) in enumerate(zip(doc_terms, self.doc_len)):
+            total = 0.0
+            for term, tf in terms.items():
+                weight = self.idf[term] * self._term_weight(tf, length)
+                self.postings.setdefault(term, []).append((doc_id, weight))
+                total += weight
+            self.self_score.append(total)
+
+    def _term_weight(self, tf, length):
+        return tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / self.avgdl))
+
+    def _query_self_score(self, query):
+        length = sum(query.values())
+        return sum(self.idf.get(term, 0.0) * self._term_weight(tf, length) for term, tf in query.items())
+
+    def search(self, question, top_k=2):
+        query = Counter(char_ngrams(question, self.ngram_range))
+        scores = {}
+        for term in query:
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        if not scores:
+            return []
+        query_self = self._query_self_score(query)
+        # Scale raw BM25 into [0, 1] so one threshold works for short and long questions
+        ranked = sorted(
+            ((score / max(query_self, self.self_score[doc_id], 1e-9), doc_id) for doc_id, score in scores.items()),
+            reverse=True,
+        )
+        return ranked[:top_k]
+
+
+class LexicalIndex:
+    """Per-language BM25 index over character n-grams of the QA questions.
+
+    Checked before the semantic index, and the only matcher when no embedding
+    backend is available, so paraphrases of known questions can still be
+    answered without calling Gemini. N-gram counts are kept per question
+    text, so a rebuild only tokenizes new questions; the BM25 weights depend
+    on the whole corpus and are recomputed.
+    """
+
+    def __init__(self, knowledge_base, k1=1.2, b=0.75, ngram_range=(2, 3)):
+        self.knowledge_base = knowledge_base
+        self.k1 = k1
+        self.b = b
+        self.ngram_range = ngram_range
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_lang = {}
+        self._terms = {}  # question -> Counter of n-grams
+
+    def _doc_terms(self, question):
+        terms = self._terms.get(question)
+        if terms is None:
+            terms = self._terms[question] = Counter(char_ngrams(question, self.ngram_range))
+        return terms
+
+    def _build_lang(self, pairs):
+        pairs = [pair for pair in pairs if pair.get('question')]
+        return _LangIndex(pairs, [self._doc_terms(pair['question']) for pair in pairs], self.k1, self.b, self.ngram_range)
+
+    def ensure_fresh(self):
+        """Rebuild the index if the knowledge base changed since the last build."""
+        self.knowledge_base.refresh()
+        version = self.knowledge_base.version
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._by_lang = {lang: self._build_lang(pairs) for lang, pairs in self.knowledge_base.by_lang.items()}
+            questions = {pair['question'] for pair in self.knowledge_base.pairs if pair.get('question')}
+            self._terms = {question: terms for question, terms in self._terms.items() if question in questions}
+            self._version = version
+
+    def top_k(self, question, lang, k=2):
+        """Return up to `k` (score, pair) tuples for `question` in `lang`, best first."""
+        self.ensure_fresh()
+        index = self._by_lang.get(lang)
+        if index is None:
+            return []
+        return [(score, index.pairs[doc_id]) for score, doc_id in index.search(question, k)]
+
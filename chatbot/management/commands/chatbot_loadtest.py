@@ -0,0 +1,157 @@
+import os
+import json
+import math
+import time
+import random
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from chatbot.chatbot import gemini_pool
+from chatbot.gemini_stub import StubGeminiModel
+from chatbot.metrics import metrics
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'loadtest_corpus.json')
+
+# Metrics counters that tell which tier answered (see chatbot.chatbot / response_cache / single_flight)
+TIER_COUNTERS = [
+    'response_cache_l1_hits', 'response_cache_l2_hits', 'match_exact', 'match_lexical', 'match_semantic', 'match_suggested',
+    'match_miss', 'llm_calls_avoided_semantic_cache', 'llm_calls_coalesced', 'gemini_calls', 'gemini_errors', 'gemini_queue_timeouts',
+    'gemini_breaker_trips', 'gemini_degraded_answers',
+]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(p / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a question corpus against the chatbot and report latency, throughput, cache hit rate and '
+        'match tiers. In-process runs use the Django test client, a private LocMem cache and a local Gemini '
+        'stub; with --url the target server should run with CHATBOT_GEMINI_STUB=True.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Total requests to send')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight')
+        parser.add_argument('--corpus', default=CORPUS_PATH, help='JSON file: {"questions": [{"question", "weight"}]}')
+        parser.add_argument('--path', default='/api/chatbot/', help='Endpoint path (e.g. /api/chatbot/stream/)')
+        parser.add_argument('--url', help='Base URL of a running server instead of the in-process test client')
+        parser.add_argument('--latency', type=float, default=0.8, help='Stub Gemini latency in seconds (in-process)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of stub Gemini calls that fail (in-process)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the question order and the stub')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        questions = self.load_corpus(options['corpus'], options['requests'], options['seed'])
+        if options['url']:
+            results = self.run(questions, self.http_sender(options['url'].rstrip('/') + options['path']), options['concurrency'])
+            tiers = None
+        else:
+            gemini_pool.set_model(StubGeminiModel(latency=options['latency'], error_rate=options['error_rate'], seed=options['seed']))
+            try:
+                with override_settings(
+                    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'chatbot-loadtest'}},
+                    SESSION_ENGINE='django.contrib.sessions.backends.cache',
+                    RATE_LIMIT_POLICIES=[],
+                    CHATBOT_EVENT_LOGGING=False,
+                    ALLOWED_HOSTS=['testserver'],
+                ):
+                    before = metrics.snapshot()['counters']
+                    results = self.run(questions, self.client_sender(options['path']), options['concurrency'])
+                    after = metrics.snapshot()['counters']
+            finally:
+                gemini_pool.set_model(None)
+            tiers = {name: after.get(name, 0) - before.get(name, 0) for name in TIER_COUNTERS}
+
+        report = self.summarize(results, tiers)
+        report['config'] = {key: options[key] for key in ('requests', 'concurrency', 'corpus', 'path', 'url', 'latency', 'error_rate', 'seed')}
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def load_corpus(self, path, count, seed):
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries = json.load(f)['questions']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read corpus {path}: {e}")
+        rng = random.Random(seed)
+        return rng.choices([entry['question'] for entry in entries], weights=[entry.get('weight', 1) for entry in entries], k=count)
+
+    def client_sender(self, path):
+        local = threading.local()
+
+        def send(question):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            # No cookies: every request is a new visitor, so per-session limits do not interfere
+            local.client.cookies.clear()
+            response = local.client.post(path, json.dumps({'question': question}), content_type='application/json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response.status_code
+        return send
+
+    def http_sender(self, url):
+        def send(question):
+            return requests.post(url, json={'question': question}, timeout=60).status_code
+        return send
+
+    def run(self, questions, send, concurrency):
+        def timed(question):
+            started = time.perf_counter()
+            try:
+                status = send(question)
+            except Exception as e:
+                status = type(e).__name__
+            return (time.perf_counter() - started) * 1000, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            samples = list(executor.map(timed, questions))
+        return {'samples': samples, 'elapsed': time.perf_counter() - started}
+
+    def summarize(self, results, tiers):
+        latencies = sorted(latency for latency, _ in results['samples'])
+        statuses = Counter(str(status) for _, status in results['samples'])
+        total = len(latencies)
+        report = {
+            'requests': total,
+            'elapsed_s': round(results['elapsed'], 3),
+            'rps': round(total / results['elapsed'], 2) if results['elapsed'] else 0.0,
+            'status_codes': dict(statuses),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 1),
+                'p95': round(percentile(latencies, 95), 1),
+                'p99': round(percentile(latencies, 99), 1),
+                'mean': round(sum(latencies) / total, 1) if total else 0.0,
+                'max': round(latencies[-1], 1) if latencies else 0.0,
+            },
+        }
+        if tiers is not None:
+            cache_hits = tiers['response_cache_l1_hits'] + tiers['response_cache_l2_hits']
+            report['cache_hit_rate'] = round(cache_hits / total, 3) if total else 0.0
+            report['tiers'] = tiers
+        return report
+
+    def print_report(self, report):
+        latency = report['latency_ms']
+        self.stdout.write(f"{report['requests']} requests in {report['elapsed_s']}s ({report['rps']} req/s), status codes: {report['status_codes']}")
+        self.stdout.write(f"Latency ms: p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']}, mean {latency['mean']}, max {latency['max']}")
+        if 'tiers' in report:
+            self.stdout.write(f"Cache hit rate: {report['cache_hit_rate']:.1%}")
+            for name, count in report['tiers'].items():
+                self.stdout.write(f"  {name}: {count}")
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.chatbot import (
+    knowledge_base, lexical_index, semantic_index, match_question, detect_language,
+    EMBEDDINGS_AVAILABLE, EMBEDDING_BACKEND, LEXICAL_MATCH_THRESHOLD, SEMANTIC_MATCH_THRESHOLD,
+)
+from chatbot.normalize import normalize_question
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'eval_questions.json')
+DEFAULT_THRESHOLDS = [round(0.3 + 0.05 * i, 2) for i in range(14)]  # 0.30 ... 0.95
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a labeled set of paraphrased questions through the chatbot matching tiers and report precision/recall '
+        'per threshold, the share of questions that would still go to Gemini and the match latency. '
+        'No Gemini calls are made.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=EVAL_PATH, help='JSON file: {"questions": [{"question", "lang", "expected"}]}')
+        parser.add_argument('--thresholds', help='Comma-separated thresholds to sweep (default 0.30-0.95 in 0.05 steps)')
+        parser.add_argument('--min-precision', type=float, default=0.95, help='Precision a suggested threshold must reach')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        thresholds = DEFAULT_THRESHOLDS
+        if options['thresholds']:
+            try:
+                thresholds = sorted(float(value) for value in options['thresholds'].split(','))
+            except ValueError:
+                raise CommandError('--thresholds must be comma-separated numbers')
+
+        knowledge_base.refresh(force=True)
+        cases = self.load_cases(options['file'])
+        matchers = {'lexical': (lexical_index, LEXICAL_MATCH_THRESHOLD)}
+        if EMBEDDINGS_AVAILABLE:
+            matchers['semantic'] = (semantic_index, SEMANTIC_MATCH_THRESHOLD)
+        for index, _ in matchers.values():
+            index.ensure_fresh()  # build outside the timed calls
+
+        report = {
+            'questions': len(cases),
+            'in_domain': sum(1 for case in cases if case['expected_answer']),
+            'knowledge_base': {'version': knowledge_base.version, 'pairs': len(knowledge_base.pairs)},
+            'embedding_backend': EMBEDDING_BACKEND,
+            'pipeline': self.evaluate_pipeline(cases),
+            'matchers': {},
+        }
+        for name, (index, current) in matchers.items():
+            samples = self.score(cases, index)
+            sweep = [self.evaluate_threshold(cases, samples, threshold) for threshold in thresholds]
+            report['matchers'][name] = {
+                'current_threshold': current,
+                'avg_latency_ms': round(sum(sample['ms'] for sample in samples) / len(samples), 3) if samples else 0.0,
+                'sweep': sweep,
+                'suggested': self.suggest(sweep, options['min_precision']),
+            }
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def load_cases(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries = json.load(f)['questions']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        answers = {(pair.get('lang', 'en'), normalize_question(pair['question'])): pair['answer'] for pair in knowledge_base.pairs}
+        cases = []
+        for entry in entries:
+            lang = entry.get('lang') or detect_language(entry['question'])
+            expected = entry.get('expected')
+            expected_answer = answers.get((lang, normalize_question(expected))) if expected else None
+            if expected and expected_answer is None:
+                self.stdout.write(self.style.WARNING(f"Skipping \"{entry['question']}\": \"{expected}\" is not in the knowledge base"))
+                continue
+            exact = knowledge_base.exact_answer(entry['question'], lang)
+            cases.append({'question': entry['question'], 'lang': lang, 'expected_answer': expected_answer, 'exact': exact})
+        if not cases:
+            raise CommandError('No usable questions in the evaluation set')
+        return cases
+
+    def score(self, cases, index):
+        """Best (score, answer) from `index` for every question, with its lookup time."""
+        samples = []
+        for case in cases:
+            started = time.perf_counter()
+            ranked = index.top_k(case['question'], case['lang'], 1)
+            ms = (time.perf_counter() - started) * 1000
+            score, answer = (ranked[0][0], ranked[0][1]['answer']) if ranked else (0.0, None)
+            samples.append({'score': float(score), 'answer': answer, 'ms': ms})
+        return samples
+
+    def evaluate_threshold(self, cases, samples, threshold):
+        """Exact match first, then this matcher at `threshold`; everything unanswered goes to Gemini."""
+        answered = correct = 0
+        for case, sample in zip(cases, samples):
+            if case['exact']:
+                answer = case['exact']
+            elif sample['score'] >= threshold:
+                answer = sample['answer']
+            else:
+                continue
+            answered += 1
+            correct += answer == case['expected_answer']
+        in_domain = sum(1 for case in cases if case['expected_answer'])
+        return {
+            'threshold': threshold,
+            'precision': round(correct / answered, 3) if answered else 1.0,
+            'recall': round(correct / in_domain, 3) if in_domain else 0.0,
+            'llm_call_rate': round(1 - answered / len(cases), 3),
+            'wrong_answers': answered - correct,
+        }
+
+    def suggest(self, sweep, min_precision):
+        """Fewest Gemini calls among thresholds that keep precision, else the most precise one."""
+        good = [row for row in sweep if row['precision'] >= min_precision]
+        if good:
+            best = min(good, key=lambda row: (row['llm_call_rate'], -row['threshold']))
+            reason = f"lowest LLM call rate with precision >= {min_precision}"
+        else:
+            best = max(sweep, key=lambda row: (row['precision'], row['recall']))
+            reason = f"no threshold reaches precision {min_precision}; most precise"
+        return {'threshold': best['threshold'], 'reason': reason}
+
+    def evaluate_pipeline(self, cases):
+        """The configured resolver (match_question) tier by tier."""
+        tiers, correct, elapsed = Counter(), Counter(), 0.0
+        for case in cases:
+            started = time.perf_counter()
+            answer, tier = match_question(case['question'], case['lang'])
+            elapsed += (time.perf_counter() - started) * 1000
+            tier = tier or 'llm'
+            tiers[tier] += 1
+            # Suggested answers are composed from several pairs: right if the expected answer is among them
+            if answer and case['expected_answer'] and (answer == case['expected_answer'] or (tier == 'suggested' and case['expected_answer'] in answer)):
+                correct[tier] += 1
+        return {
+            'tiers': {
+                tier: {'count': count, 'precision': round(correct[tier] / count, 3) if tier != 'llm' else None}
+                for tier, count in tiers.items()
+            },
+            'llm_call_rate': round(tiers['llm'] / len(cases), 3),
+            'avg_latency_ms': round(elapsed / len(cases), 3),
+        }
+
+    def print_report(self, report):
+        pipeline = report['pipeline']
+        self.stdout.write(f"{report['questions']} questions ({report['in_domain']} in the knowledge base), knowledge base {report['knowledge_base']['version']}")
+        self.stdout.write(f"Configured resolver: LLM call rate {pipeline['llm_call_rate']:.1%}, avg match latency {pipeline['avg_latency_ms']}ms")
+        for tier, stats in pipeline['tiers'].items():
+            precision = f", precision {stats['precision']:.1%}" if stats['precision'] is not None else ''
+            self.stdout.write(f"  {tier}: {stats['count']}{precision}")
+        for name, result in report['matchers'].items():
+            self.stdout.write(f"\n{name} (current threshold {result['current_threshold']}, avg latency {result['avg_latency_ms']}ms)")
+            self.stdout.write("  threshold  precision  recall  llm_calls  wrong")
+            for row in result['sweep']:
+                marker = ' <' if row['threshold'] == result['suggested']['threshold'] else ''
+                self.stdout.write(
+                    f"  {row['threshold']:>9.2f}  {row['precision']:>9.1%}  {row['recall']:>6.1%}  {row['llm_call_rate']:>9.1%}  {row['wrong_answers']:>5}{marker}"
+                )
+            self.stdout.write(self.style.SUCCESS(f"  Suggested threshold: {result['suggested']['threshold']} ({result['suggested']['reason']})"))
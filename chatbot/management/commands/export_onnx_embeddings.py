@@ -0,0 +1,82 @@
+import os
+import time
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.chatbot import EMBEDDING_MODEL_NAME, knowledge_base
+from chatbot.embeddings import ONNX_MODEL_FILE, ONNX_TOKENIZER_FILE, OnnxEmbeddingModel
+
+
+class Command(BaseCommand):
+    help = (
+        'Export the chatbot sentence-transformer to an int8-quantized ONNX model for CHATBOT_EMBEDDING_BACKEND=onnx. '
+        'Run once on a development machine with torch, transformers and onnxruntime installed; '
+        'the server then only needs onnxruntime and tokenizers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=getattr(settings, 'CHATBOT_ONNX_MODEL_DIR', None), help='Directory to write model.onnx and tokenizer.json to')
+        parser.add_argument('--model', default=f'sentence-transformers/{EMBEDDING_MODEL_NAME}', help='Hugging Face model to export')
+        parser.add_argument('--opset', type=int, default=14, help='ONNX opset version')
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            raise CommandError(f"Exporting needs torch, transformers and onnxruntime: {e}")
+        if not options['output']:
+            raise CommandError('Set CHATBOT_ONNX_MODEL_DIR or pass --output')
+        os.makedirs(options['output'], exist_ok=True)
+
+        tokenizer = AutoTokenizer.from_pretrained(options['model'])
+        model = AutoModel.from_pretrained(options['model']).eval()
+        inputs = tokenizer(['Civil Master Solution'], return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in inputs]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fp32_path = os.path.join(tmp, 'model-fp32.onnx')
+            with torch.no_grad():
+                torch.onnx.export(
+                    model, tuple(inputs[name] for name in input_names), fp32_path,
+                    input_names=input_names, output_names=['last_hidden_state'],
+                    dynamic_axes=dynamic_axes, opset_version=options['opset'],
+                )
+            model_path = os.path.join(options['output'], ONNX_MODEL_FILE)
+            quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+            fp32_size = os.path.getsize(fp32_path)
+        tokenizer.backend_tokenizer.save(os.path.join(options['output'], ONNX_TOKENIZER_FILE))
+        self.stdout.write(f"Wrote {model_path}: {os.path.getsize(model_path) / 2**20:.1f}MB (float32 export {fp32_size / 2**20:.1f}MB)")
+        self.compare(options['output'], np)
+
+    def compare(self, model_dir, np):
+        """Check the int8 model against sentence-transformers on the Q&A questions, if it is installed."""
+        try:
+            import sentence_transformers
+        except ImportError:
+            return
+        knowledge_base.refresh(force=True)
+        questions = [pair['question'] for pair in knowledge_base.pairs]
+        if not questions:
+            return
+        reference = sentence_transformers.SentenceTransformer(EMBEDDING_MODEL_NAME)
+        onnx_model = OnnxEmbeddingModel(model_dir)
+        expected = reference.encode(questions, normalize_embeddings=True)
+        started = time.perf_counter()
+        actual = onnx_model.encode(questions)
+        onnx_ms = (time.perf_counter() - started) * 1000 / len(questions)
+        started = time.perf_counter()
+        reference.encode(questions, normalize_embeddings=True)
+        torch_ms = (time.perf_counter() - started) * 1000 / len(questions)
+        cosine = (np.asarray(expected) * actual).sum(axis=1)
+        # Same nearest Q&A pair for every question means matching behaves the same
+        agreement = np.mean(np.argmax(actual @ actual.T - 2 * np.eye(len(actual)), axis=1) == np.argmax(expected @ expected.T - 2 * np.eye(len(expected)), axis=1))
+        self.stdout.write(
+            f"int8 vs float32 on {len(questions)} Q&A questions: mean cosine {cosine.mean():.4f} (min {cosine.min():.4f}), "
+            f"same nearest neighbour {agreement:.1%}, {onnx_ms:.2f}ms vs {torch_ms:.2f}ms per question"
+        )
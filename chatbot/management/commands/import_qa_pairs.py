@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from chatbot.chatbot import (
+    QA_DATA_PATH, EMBEDDINGS_AVAILABLE, EMBEDDING_MODEL_ID, knowledge_base, encode_questions, categorize_question,
+)
+from chatbot.models import QAPair
+
+
+class Command(BaseCommand):
+    help = 'Import chatbot Q&A pairs from a JSON file (default: qachatbot_data.json) into the QAPair table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=QA_DATA_PATH, help='JSON file with a "qa_pairs" list')
+        parser.add_argument('--replace', action='store_true', help='Delete pairs that are not in the file')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], encoding='utf-8') as f:
+                entries = json.load(f)['qa_pairs']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read {options['file']}: {e}")
+
+        existing = {(pair.lang, pair.question): pair for pair in QAPair.objects.all()}
+        to_create, to_update, seen = [], [], set()
+        for entry in entries:
+            question, answer = entry.get('question', '').strip(), entry.get('answer', '').strip()
+            if not question or not answer:
+                continue
+            key = (entry.get('lang', 'en'), question)
+            if key in seen:
+                continue
+            seen.add(key)
+            category = entry.get('category') or categorize_question(question)
+            pair = existing.get(key)
+            if pair is None:
+                to_create.append(QAPair(question=question, answer=answer, lang=key[0], category=category))
+            elif (pair.answer, pair.category) != (answer, category) or (EMBEDDINGS_AVAILABLE and pair.embedding_model != EMBEDDING_MODEL_ID):
+                pair.answer, pair.category, pair.updated_at = answer, category, timezone.now()
+                to_update.append(pair)
+
+        # Embed all new questions (and ones stored without an embedding from the current model) in one batch
+        needs_embedding = [pair for pair in to_create + to_update if pair.embedding is None or (EMBEDDINGS_AVAILABLE and pair.embedding_model != EMBEDDING_MODEL_ID)]
+        vectors, model_name = encode_questions([pair.question for pair in needs_embedding])
+        if vectors is not None:
+            for pair, vector in zip(needs_embedding, vectors):
+                pair.embedding, pair.embedding_model = vector.tobytes(), model_name
+        elif needs_embedding:
+            self.stdout.write(self.style.WARNING('No embedding backend is available; pairs are stored without embeddings.'))
+
+        stale = [pair.pk for key, pair in existing.items() if key not in seen] if options['replace'] else []
+        # bulk_* skip QAPair.save(), so the knowledge base is reloaded once at the end
+        with transaction.atomic():
+            QAPair.objects.bulk_create(to_create, batch_size=500)
+            QAPair.objects.bulk_update(to_update, ['answer', 'category', 'embedding', 'embedding_model', 'updated_at'], batch_size=500)
+            QAPair.objects.filter(pk__in=stale).delete()
+        result = knowledge_base.reload()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported Q&A pairs: {len(to_create)} created, {len(to_update)} updated, {len(stale)} deleted, "
+            f"{len(seen) - len(to_create) - len(to_update)} unchanged (knowledge base version {result['version']}, source {knowledge_base.source})"
+        ))
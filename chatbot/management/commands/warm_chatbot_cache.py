@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from chatbot.chatbot import (
+    knowledge_base, popular_questions, response_cache, gemini_pool, spend_tracker, company_data,
+    get_response_cache_key, find_match, detect_language, generate_gemini_response,
+    is_over_budget, is_fallback_response,
+)
+
+
+class Command(BaseCommand):
+    help = 'Load answers for the Q&A set and popular questions into the shared chatbot response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--popular', type=int, default=50, help='How many of the most asked questions to warm')
+        parser.add_argument('--questions-file', help='Extra questions to warm, one per line')
+        parser.add_argument('--concurrency', type=int, default=gemini_pool.max_concurrency, help='Gemini calls in flight')
+        parser.add_argument('--max-gemini-calls', type=int, default=100, help='Stop generating after this many Gemini calls')
+        parser.add_argument('--no-gemini', action='store_true', help='Only cache answers found in the Q&A set')
+
+    def handle(self, *args, **options):
+        if 'LocMemCache' in settings.CACHES['default']['BACKEND']:
+            self.stdout.write(self.style.WARNING('The cache is per-process (LocMem); warming it here would not reach the web workers. Skipping.'))
+            return
+
+        started = time.perf_counter()
+        spend_before = spend_tracker.month_spend()
+        stats = {'already_cached': 0, 'qa_set': 0, 'matched': 0, 'generated': 0, 'failed': 0, 'skipped': 0}
+
+        # Q&A set: answers are known, no Gemini call needed
+        knowledge_base.refresh(force=True)
+        for pair in knowledge_base.pairs:
+            lang = pair.get('lang', 'en')
+            key = get_response_cache_key(pair['question'], lang)
+            if cache.get(key) is not None:
+                stats['already_cached'] += 1
+                continue
+            response_cache.set(key, knowledge_base.exact_answer(pair['question'], lang) or pair['answer'])
+            stats['qa_set'] += 1
+
+        # Popular and listed questions: matched from the Q&A set if possible, otherwise generated
+        to_generate = []
+        seen = set()
+        for question, lang in self.extra_questions(options):
+            key = get_response_cache_key(question, lang)
+            if key in seen:
+                continue
+            seen.add(key)
+            if cache.get(key) is not None:
+                stats['already_cached'] += 1
+                continue
+            match = find_match(question, lang)
+            if match:
+                response_cache.set(key, match)
+                stats['matched'] += 1
+            else:
+                to_generate.append((question, lang, key))
+
+        if options['no_gemini']:
+            stats['skipped'] += len(to_generate)
+            to_generate = []
+        elif len(to_generate) > options['max_gemini_calls']:
+            stats['skipped'] += len(to_generate) - options['max_gemini_calls']
+            to_generate = to_generate[:options['max_gemini_calls']]
+
+        latencies = []
+
+        def generate(item):
+            question, lang, key = item
+            if is_over_budget():
+                return 'skipped'
+            call_started = time.perf_counter()
+            answer = generate_gemini_response(question, company_data[lang], lang)
+            latencies.append(time.perf_counter() - call_started)
+            if is_fallback_response(answer):
+                return 'failed'
+            response_cache.set(key, answer)
+            return 'generated'
+
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as executor:
+            for outcome in executor.map(generate, to_generate):
+                stats[outcome] += 1
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(', '.join(f"{name}: {count}" for name, count in stats.items()))
+        if latencies:
+            self.stdout.write(f"Gemini: {len(latencies)} calls, avg {sum(latencies) / len(latencies):.2f}s, max {max(latencies):.2f}s")
+        self.stdout.write(f"Spend this run: ${spend_tracker.month_spend() - spend_before:.6f}")
+        self.stdout.write(self.style.SUCCESS(f"Chatbot cache warmed in {elapsed:.1f}s"))
+
+    def extra_questions(self, options):
+        for entry in popular_questions.top(options['popular']):
+            yield entry['question'], entry['lang']
+        if options['questions_file']:
+            with open(options['questions_file'], encoding='utf-8') as f:
+                for line in f:
+                    question = line.strip()
+                    if question:
+                        yield question, detect_language(question)
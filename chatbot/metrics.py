@@ -0,0 +1,42 @@
+import threading
+
+
+class Metrics:
+    """Thread-safe, per-process counters and timings for the chatbot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        """Record one timing sample (e.g. milliseconds) under `name`."""
+        with self._lock:
+            stats = self._timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += value
+            stats['max'] = max(stats['max'], value)
+
+    def snapshot(self):
+        with self._lock:
+            timings = {
+                name: {
+                    'count': stats['count'],
+                    'avg': stats['total'] / stats['count'] if stats['count'] else 0.0,
+                    'max': stats['max'],
+                }
+                for name, stats in self._timings.items()
+            }
+            return {'counters': dict(self._counters), 'timings': timings}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QAPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.TextField()),
+                ('answer', models.TextField()),
+                ('lang', models.CharField(choices=[('en', 'English'), ('th', 'Thai')], default='en', max_length=2)),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('embedding', models.BinaryField(blank=True, null=True)),
+                ('embedding_model', models.CharField(blank=True, default='', editable=False, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['lang'], name='chatbot_qap_lang_dc1a39_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('turn', 'Chat turn'), ('honeypot', 'Honeypot triggered'), ('rate_limited', 'Rate limited'), ('rejected', 'Rejected input')], default='turn', max_length=20)),
+                ('conversation_id', models.CharField(blank=True, default='', max_length=32)),
+                ('ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('lang', models.CharField(blank=True, default='', max_length=2)),
+                ('question', models.TextField(blank=True, default='')),
+                ('answer', models.TextField(blank=True, default='')),
+                ('tier', models.CharField(blank=True, default='', max_length=20)),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+                ('input_tokens', models.PositiveIntegerField(default=0)),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['kind', 'created_at'], name='chatbot_cha_kind_71d880_idx')],
+            },
+        ),
+    ]
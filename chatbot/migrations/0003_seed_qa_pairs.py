@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:10
+
+from django.db import migrations
+import json
+import os
+
+QA_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'qachatbot_data.json')
+
+
+def load_qa_pairs():
+    with open(QA_DATA_PATH, encoding='utf-8') as f:
+        entries = json.load(f)['qa_pairs']
+    pairs, seen = [], set()
+    for entry in entries:
+        question, answer = entry.get('question', '').strip(), entry.get('answer', '').strip()
+        key = (entry.get('lang', 'en'), question)
+        if question and answer and key not in seen:
+            seen.add(key)
+            pairs.append((key[0], question, answer, entry.get('category', '')))
+    return pairs
+
+
+def seed_qa_pairs(apps, schema_editor):
+    """Copy qachatbot_data.json into the QAPair table.
+
+    The knowledge base reads the table as soon as it has any rows, so it must
+    start with every pair rather than with the first one added in the admin.
+    Embeddings and categories are filled in by `manage.py import_qa_pairs`;
+    until then the semantic index encodes the questions when it is built.
+    """
+    QAPair = apps.get_model('chatbot', 'QAPair')
+    if QAPair.objects.exists():
+        return  # already seeded with import_qa_pairs
+    QAPair.objects.bulk_create([
+        QAPair(lang=lang, question=question, answer=answer, category=category)
+        for lang, question, answer, category in load_qa_pairs()
+    ])
+
+
+def unseed_qa_pairs(apps, schema_editor):
+    """Reverse migration: delete the pairs that came from qachatbot_data.json"""
+    QAPair = apps.get_model('chatbot', 'QAPair')
+    for lang, question, answer, category in load_qa_pairs():
+        QAPair.objects.filter(lang=lang, question=question, answer=answer).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_chatevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_qa_pairs, unseed_qa_pairs),
+    ]
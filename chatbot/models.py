@@ -1,3 +1,68 @@
 from django.db import models
 
-# Create your models here.
+
+class QAPair(models.Model):
+    LANG_CHOICES = [
+        ('en', 'English'),
+        ('th', 'Thai')
+    ]
+    question = models.TextField()
+    answer = models.TextField()
+    lang = models.CharField(max_length=2, choices=LANG_CHOICES, default='en')
+    category = models.CharField(max_length=50, blank=True, default='')
+    embedding = models.BinaryField(null=True, blank=True, editable=False)  # float32 vector of the question
+    embedding_model = models.CharField(max_length=100, blank=True, default='', editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['lang'])]
+
+    def __str__(self):
+        return self.question
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_question = instance.__dict__.get('question')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Embed the question once here (only when it changed) instead of on every chatbot request."""
+        from .chatbot import encode_questions, categorize_question
+        if not self.category:
+            self.category = categorize_question(self.question)
+        if self.embedding is None or self.question != getattr(self, '_loaded_question', None):
+            vectors, model_name = encode_questions([self.question])
+            self.embedding = vectors[0].tobytes() if vectors is not None else None
+            self.embedding_model = model_name if vectors is not None else ''
+        super().save(*args, **kwargs)
+        self._loaded_question = self.question
+
+
+class ChatEvent(models.Model):
+    """One chatbot turn or abuse event, written in batches by chatbot.events.EventSink."""
+    KIND_CHOICES = [
+        ('turn', 'Chat turn'),
+        ('honeypot', 'Honeypot triggered'),
+        ('rate_limited', 'Rate limited'),
+        ('rejected', 'Rejected input')
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='turn')
+    conversation_id = models.CharField(max_length=32, blank=True, default='')
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    lang = models.CharField(max_length=2, blank=True, default='')
+    question = models.TextField(blank=True, default='')
+    answer = models.TextField(blank=True, default='')
+    tier = models.CharField(max_length=20, blank=True, default='')  # which layer answered, or the limit/reason for other kinds
+    latency_ms = models.FloatField(null=True, blank=True)
+    input_tokens = models.PositiveIntegerField(default=0)
+    output_tokens = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['kind', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.kind} {self.created_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+# Characters NFKC leaves alone but users type interchangeably
+_CHAR_FOLDS = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u2032': "'", '`': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': '"', '\u2033': '"',
+    '\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-', '\u2212': '-',
+    '\u3001': ',', '\u3002': '.',
+    '\u200b': None, '\u200c': None, '\u200d': None, '\u2060': None, '\ufeff': None,
+})
+_WHITESPACE_RE = re.compile(r'\s+')
+_EDGE_PUNCT_RE = re.compile(r'^[\s\'"]+|[\s?!.,;:\'"~]+$')
+
+
+def normalize_question(text):
+    """Fold trivial variants of a question to one key (English and Thai).
+
+    NFKC composes Thai vowels/tone marks and maps full-width forms to ASCII,
+    then case, quotes, dashes, zero-width characters, repeated whitespace and
+    leading/trailing punctuation are folded.
+    """
+    text = unicodedata.normalize('NFKC', text or '').translate(_CHAR_FOLDS).casefold()
+    text = _WHITESPACE_RE.sub(' ', text)
+    return _EDGE_PUNCT_RE.sub('', text)
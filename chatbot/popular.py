@@ -0,0 +1,56 @@
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+
+from .normalize import normalize_question
+
+CACHE_KEY = 'chatbot_popular_questions'
+CACHE_TTL = 60 * 60 * 24 * 7
+
+
+class PopularQuestions:
+    """Approximate counts of the questions users ask, shared through the cache.
+
+    Each worker counts locally and merges its counts into one cached dict every
+    `flush_every` questions. The merge is a plain read-modify-write, so
+    concurrent flushes can drop a few counts; popularity only needs to be
+    roughly right. Only the `max_entries` most asked questions are kept.
+    """
+
+    def __init__(self, max_entries=200, flush_every=50):
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self._pending = Counter()  # (lang, normalized question) -> count
+        self._texts = {}  # (lang, normalized question) -> question as first asked
+        self._recorded = 0
+        self._lock = threading.Lock()
+
+    def record(self, question, lang):
+        """Count one question; returns True when a flush() is due."""
+        key = (lang, normalize_question(question))
+        with self._lock:
+            self._pending[key] += 1
+            self._texts.setdefault(key, question)
+            self._recorded += 1
+            return self._recorded >= self.flush_every
+
+    def flush(self):
+        with self._lock:
+            pending, texts = self._pending, self._texts
+            self._pending, self._texts, self._recorded = Counter(), {}, 0
+        if not pending:
+            return
+        merged = cache.get(CACHE_KEY) or {}
+        for (lang, normalized), count in pending.items():
+            entry_key = f"{lang}:{normalized}"
+            entry = merged.get(entry_key) or {'question': texts[(lang, normalized)], 'lang': lang, 'count': 0}
+            entry['count'] += count
+            merged[entry_key] = entry
+        top = sorted(merged.items(), key=lambda item: item[1]['count'], reverse=True)[:self.max_entries]
+        cache.set(CACHE_KEY, dict(top), CACHE_TTL)
+
+    def top(self, n=50):
+        """The `n` most asked questions as [{'question', 'lang', 'count'}], most asked first."""
+        entries = cache.get(CACHE_KEY) or {}
+        return sorted(entries.values(), key=lambda entry: entry['count'], reverse=True)[:n]
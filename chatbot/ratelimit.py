@@ -0,0 +1,136 @@
+import time
+import math
+import threading
+import logging
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+
+from .events import chat_events
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def get_client_ip(request):
+    """Client IP, taken from X-Forwarded-For behind TRUSTED_PROXY_COUNT proxies.
+
+    Each trusted proxy (Render's load balancer) appends the address it saw, so
+    the client is the Nth entry from the right; anything further left is
+    client-controlled and ignored.
+    """
+    trusted = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if trusted and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted, len(hops))]
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counter: `limit` requests per `window` seconds per key.
+
+    The current window's counter is bumped with one atomic cache.incr; the
+    previous window's count is final once that window ends, so each worker
+    reads it once and remembers it locally. The estimate weights the previous
+    window by how much of it still overlaps the sliding window.
+    """
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self._previous = OrderedDict()  # (key, window index) -> final count
+        self._lock = threading.Lock()
+
+    def _cache_key(self, key, index):
+        return f"rl:{self.name}:{key}:{index}"
+
+    def _incr(self, cache_key):
+        try:
+            return cache.incr(cache_key)
+        except ValueError:
+            if cache.add(cache_key, 1, self.window * 2):
+                return 1
+            return cache.incr(cache_key)
+
+    def _previous_count(self, key, index):
+        memo_key = (key, index)
+        with self._lock:
+            if memo_key in self._previous:
+                return self._previous[memo_key]
+        count = cache.get(self._cache_key(key, index), 0)
+        with self._lock:
+            self._previous[memo_key] = count
+            while len(self._previous) > 10000:
+                self._previous.popitem(last=False)
+        return count
+
+    def hit(self, key, now=None):
+        """Count one request; returns (allowed, retry_after_seconds)."""
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        current = self._incr(self._cache_key(key, index))
+        overlap = 1 - (now % self.window) / self.window
+        estimate = current + self._previous_count(key, index - 1) * overlap
+        if estimate <= self.limit:
+            return True, 0
+        return False, max(1, math.ceil(self.window - now % self.window))
+
+
+def load_policies():
+    """Build limiters from settings.RATE_LIMIT_POLICIES, longest path prefix first."""
+    policies = []
+    for policy in getattr(settings, 'RATE_LIMIT_POLICIES', []):
+        limiter = SlidingWindowLimiter(policy['name'], policy['limit'], policy['window'])
+        policies.append((policy['path'], set(policy.get('methods', [])), limiter))
+    return sorted(policies, key=lambda policy: len(policy[0]), reverse=True)
+
+
+def _match(policies, request):
+    for prefix, methods, limiter in policies:
+        if request.path.startswith(prefix) and (not methods or request.method in methods):
+            return limiter
+    return None
+
+
+def _check(limiter, request):
+    ip = get_client_ip(request)
+    allowed, retry_after = limiter.hit(ip)
+    if allowed:
+        return None
+    metrics.incr(f'rate_limited_{limiter.name}')
+    chat_events.emit('rate_limited', tier=limiter.name, ip=ip)
+    response = JsonResponse({'error': 'Too many requests from your IP. Please wait.'}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+@sync_and_async_middleware
+def RateLimitMiddleware(get_response):
+    """Per-route, per-client-IP rate limits from settings.RATE_LIMIT_POLICIES."""
+    policies = load_policies()
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            limiter = _match(policies, request)
+            if limiter:
+                limited = await sync_to_async(_check)(limiter, request)
+                if limited:
+                    return limited
+            return await get_response(request)
+    else:
+        def middleware(request):
+            limiter = _match(policies, request)
+            if limiter:
+                limited = _check(limiter, request)
+                if limited:
+                    return limited
+            return get_response(request)
+
+    return middleware
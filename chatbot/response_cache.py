@@ -0,0 +1,86 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .metrics import metrics
+from .normalize import normalize_question
+
+
+def response_cache_key(question, lang, kb_version):
+    """Key that is identical in every worker and across restarts (unlike hash())."""
+    raw = f"{lang}\x00{kb_version}\x00{normalize_question(question)}"
+    return f"chatbot_response:{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"
+
+
+class ResponseCache:
+    """Small in-process LRU (L1) in front of the shared Django cache (L2).
+
+    L2 (Redis on Render) is shared by all workers; L1 serves repeated
+    questions from memory without a network round trip. L1 entries expire
+    after `l1_ttl` seconds so workers pick up L2 changes reasonably soon.
+    """
+
+    def __init__(self, ttl=3600, l1_ttl=60, l1_max_entries=512):
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+        self.l1_max_entries = l1_max_entries
+        self._l1 = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return entry[1]
+
+    def _l1_set(self, key, value):
+        with self._lock:
+            self._l1[key] = (time.monotonic() + self.l1_ttl, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def get(self, key):
+        value = self._l1_get(key)
+        if value is not None:
+            metrics.incr('response_cache_l1_hits')
+            return value
+        value = cache.get(key)
+        if value is None:
+            metrics.incr('response_cache_misses')
+            return None
+        metrics.incr('response_cache_l2_hits')
+        self._l1_set(key, value)
+        return value
+
+    def peek(self, key):
+        """Read the shared cache only (no L1, no metrics); used while polling for an in-flight answer."""
+        return cache.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._l1_set(key, value)
+        cache.set(key, value, ttl or self.ttl)
+
+    async def aget(self, key):
+        value = self._l1_get(key)
+        if value is not None:
+            metrics.incr('response_cache_l1_hits')
+            return value
+        return await sync_to_async(self.get)(key)
+
+    async def aset(self, key, value, ttl=None):
+        self._l1_set(key, value)
+        await cache.aset(key, value, ttl or self.ttl)
+
+    def clear_local(self):
+        with self._lock:
+            self._l1.clear()
@@ -0,0 +1,103 @@
+import math
+import re
+import time
+import threading
+from collections import Counter, OrderedDict
+
+from .lexical_index import char_ngrams
+from .metrics import metrics
+from .normalize import normalize_question
+
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*')
+_NEGATION_RE = re.compile(r"\b(?:not|no|never|none|nor|without|cannot|\w+n't|dont|doesnt|isnt|arent|cant|wont|didnt)\b")
+_THAI_NEGATIONS = ('ไม่', 'ห้าม')
+
+
+def meaning_markers(text):
+    """Numbers and negation words in the question, which n-gram similarity barely sees.
+
+    "150 mm" vs "250 mm" or "suitable" vs "not suitable" differ by a few
+    n-grams but need different answers, so a cached answer is only reused
+    for a question with the same markers.
+    """
+    text = normalize_question(text)
+    numbers = tuple(number.replace(',', '') for number in _NUMBER_RE.findall(text))
+    negations = _NEGATION_RE.findall(text) + [word for word in _THAI_NEGATIONS for _ in range(text.count(word))]
+    return numbers, tuple(sorted(negations))
+
+
+def lexical_fingerprint(text):
+    """L2-normalized sparse vector of character n-gram counts."""
+    counts = Counter(char_ngrams(text))
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {gram: v / norm for gram, v in counts.items()}
+
+
+def lexical_similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(gram, 0.0) for gram, v in a.items())
+
+
+class SemanticResponseCache:
+    """Bounded index of recent Gemini answers, reused for near-duplicate questions.
+
+    Questions are fingerprinted with the question embedding when
+    `embed` is given (reused at `threshold`), otherwise with character
+    n-grams (reused at the stricter `lexical_threshold`, since rewordings
+    with a different meaning still share most n-grams). Either way the
+    numbers and negation words must match. Entries are tied to the
+    knowledge-base version, expire after `ttl` seconds and the least
+    recently used one is evicted beyond `max_entries`.
+    """
+
+    def __init__(self, threshold, max_entries=256, ttl=3600, embed=None, lexical_threshold=0.97):
+        self.threshold = threshold if embed is not None else lexical_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._embed = embed
+        self._entries = OrderedDict()  # (lang, normalized question) -> (expires_at, version, markers, fingerprint, answer)
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, question):
+        if self._embed is not None:
+            return self._embed(question)
+        return lexical_fingerprint(question)
+
+    def _similarity(self, a, b):
+        if self._embed is not None:
+            return float(a @ b)
+        return lexical_similarity(a, b)
+
+    def lookup(self, question, lang, kb_version):
+        """Return a cached answer for a near-duplicate question, or None."""
+        if not self._entries:
+            return None
+        fingerprint, markers = self._fingerprint(question), meaning_markers(question)
+        now = time.monotonic()
+        best_key, best_score = None, self.threshold
+        with self._lock:
+            for key, (expires_at, version, other_markers, other, answer) in list(self._entries.items()):
+                if expires_at < now or version != kb_version:
+                    del self._entries[key]
+                    continue
+                if key[0] != lang or other_markers != markers:
+                    continue
+                score = self._similarity(fingerprint, other)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            answer = self._entries[best_key][4]
+        metrics.incr('llm_calls_avoided_semantic_cache')
+        return answer
+
+    def add(self, question, lang, kb_version, answer):
+        fingerprint = self._fingerprint(question)
+        key = (lang, normalize_question(question))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, kb_version, meaning_markers(question), fingerprint, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,79 @@
+import time
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticIndex:
+    """Per-language matrix of normalized QA question embeddings.
+
+    The matrix is built once from the knowledge base and rebuilt when its
+    version changes, so a lookup costs one encoder call for the user question
+    plus a single matrix-vector product. Embeddings are kept per question
+    text, so a rebuild only encodes questions that were added or reworded,
+    and embeddings stored in the database are not encoded at all.
+    """
+
+    def __init__(self, knowledge_base, get_model, model_name=None):
+        self.knowledge_base = knowledge_base
+        self._get_model = get_model
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_lang = {}  # lang -> (matrix, pairs)
+        self._vectors = {}  # question -> embedding
+
+    def _build(self, model):
+        questions = {pair['question'] for pair in self.knowledge_base.pairs if pair.get('question')}
+        # Embeddings stored with QAPair rows are used as-is when they come from the same model
+        for pair in self.knowledge_base.pairs:
+            if pair.get('embedding') and pair.get('embedding_model') == self.model_name and pair['question'] not in self._vectors:
+                self._vectors[pair['question']] = np.frombuffer(pair['embedding'], dtype=np.float32)
+        missing = sorted(questions - self._vectors.keys())
+        if missing:
+            encoded = model.encode(missing, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+            self._vectors.update(zip(missing, np.asarray(encoded, dtype=np.float32)))
+        self._vectors = {question: self._vectors[question] for question in questions}
+        by_lang = {}
+        for lang, lang_pairs in self.knowledge_base.by_lang.items():
+            pairs = [pair for pair in lang_pairs if pair.get('question')]
+            if pairs:
+                by_lang[lang] = (np.stack([self._vectors[pair['question']] for pair in pairs]), pairs)
+        return by_lang, len(missing)
+
+    def ensure_fresh(self):
+        """Rebuild the matrices if the knowledge base changed since the last build."""
+        self.knowledge_base.refresh()
+        version = self.knowledge_base.version
+        if self._by_lang and version == self._version:
+            return True
+        model = self._get_model()
+        if model is None:
+            return False
+        with self._lock:
+            if self._by_lang and version == self._version:
+                return True
+            started = time.perf_counter()
+            self._by_lang, encoded = self._build(model)
+            self._version = version
+            logger.info(f"Built semantic QA index for {len(self._by_lang)} languages ({encoded} questions encoded) in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+
+    def top_k(self, question, lang, k=2):
+        """Return up to `k` (score, pair) tuples for `question` in `lang`, best first."""
+        if not self.ensure_fresh():
+            return []
+        entry = self._by_lang.get(lang)
+        if entry is None:
+            return []
+        matrix, pairs = entry
+        query = self._get_model().encode(question, convert_to_numpy=True, normalize_embeddings=True)
+        scores = matrix @ np.asarray(query, dtype=np.float32)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), pairs[i]) for i in top]
+
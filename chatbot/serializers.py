@@ -0,0 +1,13 @@
+from rest_framework import serializers
+from .models import QAPair
+
+class QAPairSerializer(serializers.ModelSerializer):
+    has_embedding = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QAPair
+        fields = ['id', 'question', 'answer', 'lang', 'category', 'has_embedding', 'embedding_model', 'updated_at']
+        read_only_fields = ['embedding_model', 'updated_at']
+
+    def get_has_embedding(self, obj):
+        return obj.embedding is not None
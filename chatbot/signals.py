@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import QAPair
+
+
+@receiver([post_save, post_delete], sender=QAPair, dispatch_uid='chatbot_qapair_reload')
+def reload_knowledge_base(sender, using, **kwargs):
+    """Reload the Q&A pairs in every worker once the change is committed.
+
+    post_delete is also sent for queryset.delete() (e.g. the admin "delete
+    selected" action). update() and bulk_create() send no signals, so code
+    using them calls knowledge_base.reload() itself (see import_qa_pairs).
+    """
+    from .chatbot import knowledge_base
+    knowledge_base.reload_on_commit(using)
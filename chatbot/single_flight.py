@@ -0,0 +1,101 @@
+import time
+import threading
+
+from django.core.cache import cache
+
+from .metrics import metrics
+
+LEAD, POLL, WAIT = 'lead', 'poll', 'wait'
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """Lets one caller per key do an expensive computation while duplicates wait for it.
+
+    Within a process duplicates wait on the leader's Event. Across workers a
+    short `cache.add` lock elects the leader; the first request in every
+    other worker polls `lookup()` (normally the shared response cache) until
+    the leader's result appears or the lock is released, and the rest of that
+    worker waits on it. A crashed leader's lock expires after `lock_ttl`.
+
+    Usage: role, flight = begin(key); the LEAD computes and calls
+    finish(key, flight, result); anyone else calls wait(key, role, flight, lookup)
+    and computes the result itself if that returns None.
+    """
+
+    def __init__(self, lock_ttl=60, wait_timeout=30, poll_interval=0.25):
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _lock_key(self, key):
+        return f"chatbot_inflight:{key}"
+
+    def begin(self, key):
+        """Claim `key`; returns (role, flight) with role LEAD, POLL or WAIT."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return WAIT, flight
+            flight = self._flights[key] = _Flight()
+        if cache.add(self._lock_key(key), 1, self.lock_ttl):
+            return LEAD, flight
+        return POLL, flight
+
+    def _settle(self, key, flight, result):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.event.set()
+
+    def finish(self, key, flight, result):
+        """Hand the leader's result (None on failure) to the waiters and release the lock."""
+        self._settle(key, flight, result)
+        cache.delete(self._lock_key(key))
+
+    def wait(self, key, role, flight, lookup):
+        """Result computed by the leader, or None if it did not arrive within wait_timeout."""
+        if role == WAIT:
+            flight.event.wait(self.wait_timeout)
+            result = flight.result
+        else:
+            result = None
+            deadline = time.monotonic() + self.wait_timeout
+            try:
+                while time.monotonic() < deadline:
+                    result = lookup()
+                    if result is not None:
+                        break
+                    if cache.get(self._lock_key(key)) is None:
+                        # The leader finished without a cacheable result, or died
+                        result = lookup()
+                        break
+                    time.sleep(self.poll_interval)
+            finally:
+                self._settle(key, flight, result)
+        if result is not None:
+            metrics.incr('llm_calls_coalesced')
+        return result
+
+    def run(self, key, compute, lookup):
+        """compute() once across concurrent callers with the same key; returns (result, computed)."""
+        role, flight = self.begin(key)
+        if role != LEAD:
+            result = self.wait(key, role, flight, lookup)
+            if result is not None:
+                return result, False
+            return compute(), True
+        result = None
+        try:
+            result = compute()
+            return result, True
+        finally:
+            self.finish(key, flight, result)
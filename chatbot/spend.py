@@ -0,0 +1,105 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_TTL = 60 * 60 * 24 * 62  # keep the current and previous month for reporting
+
+
+def _incr(key, delta):
+    """Atomic increment (Redis INCRBY / LocMem's locked incr), creating the key if missing."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, KEY_TTL)
+        return cache.incr(key, delta)
+
+
+class SpendTracker:
+    """Monthly and daily Gemini spend from the token counts Gemini reports.
+
+    Input and output tokens are kept as integer counters so every worker
+    can add to them atomically; dollars are derived on read.
+    """
+
+    def __init__(self, monthly_budget, input_price_per_1k, output_price_per_1k, alert_email=None, alert_thresholds=(0.5, 0.8, 1.0)):
+        self.monthly_budget = monthly_budget
+        self.input_price_per_1k = input_price_per_1k
+        self.output_price_per_1k = output_price_per_1k
+        self.alert_email = alert_email
+        self.alert_thresholds = alert_thresholds
+
+    def cost(self, input_tokens, output_tokens):
+        return (input_tokens / 1000.0) * self.input_price_per_1k + (output_tokens / 1000.0) * self.output_price_per_1k
+
+    def month_key(self, day=None):
+        day = day or timezone.localdate()
+        return f"chatbot_tokens_{day.year}_{day.month:02d}"
+
+    def day_key(self, day=None):
+        day = day or timezone.localdate()
+        return f"chatbot_tokens_{day.isoformat()}"
+
+    def _read(self, prefix):
+        counts = cache.get_many([f"{prefix}_in", f"{prefix}_out"])
+        return counts.get(f"{prefix}_in", 0), counts.get(f"{prefix}_out", 0)
+
+    def month_spend(self, day=None):
+        return self.cost(*self._read(self.month_key(day)))
+
+    def is_over_budget(self):
+        return self.month_spend() >= self.monthly_budget
+
+    def record(self, input_tokens, output_tokens):
+        """Add one Gemini call's usage; returns the month's spend afterwards."""
+        today = timezone.localdate()
+        day_prefix, month_prefix = self.day_key(today), self.month_key(today)
+        _incr(f"{day_prefix}_in", input_tokens)
+        _incr(f"{day_prefix}_out", output_tokens)
+        spend = self.cost(_incr(f"{month_prefix}_in", input_tokens), _incr(f"{month_prefix}_out", output_tokens))
+        self._alert_on_crossing(today, spend)
+        return spend
+
+    def _alert_on_crossing(self, today, spend):
+        if not self.alert_email:
+            return
+        for threshold in self.alert_thresholds:
+            if spend < self.monthly_budget * threshold:
+                continue
+            # cache.add succeeds for exactly one caller, so each crossing is emailed once
+            alert_key = f"chatbot_spend_alert_{today.year}_{today.month:02d}_{int(threshold * 100)}"
+            if cache.add(alert_key, True, KEY_TTL):
+                subject = 'Chatbot Monthly Budget Exceeded' if threshold >= 1 else f'Chatbot Monthly Budget {int(threshold * 100)}% Used'
+                send_mail(subject, f'Budget of ${self.monthly_budget} is {spend / self.monthly_budget:.0%} used. Current spend: ${spend:.6f}', settings.DEFAULT_FROM_EMAIL, [self.alert_email], fail_silently=True)
+                logger.warning(f"{subject}: ${spend:.6f}")
+
+    def daily_report(self, year, month):
+        """Token counts and spend for each day of a month, plus the month total."""
+        first = date(year, month, 1)
+        month_days = [first + timedelta(days=i) for i in range(31) if (first + timedelta(days=i)).month == month]
+        prefixes = [self.day_key(day) for day in month_days] + [self.month_key(first)]
+        counts = cache.get_many([f"{prefix}_{kind}" for prefix in prefixes for kind in ('in', 'out')])
+        days = []
+        for day, prefix in zip(month_days, prefixes):
+            input_tokens, output_tokens = counts.get(f"{prefix}_in", 0), counts.get(f"{prefix}_out", 0)
+            if input_tokens or output_tokens:
+                days.append({
+                    'date': day.isoformat(),
+                    'input_tokens': input_tokens,
+                    'output_tokens': output_tokens,
+                    'cost': self.cost(input_tokens, output_tokens),
+                })
+        input_tokens, output_tokens = counts.get(f"{prefixes[-1]}_in", 0), counts.get(f"{prefixes[-1]}_out", 0)
+        return {
+            'month': f"{year}-{month:02d}",
+            'budget': self.monthly_budget,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'spend': self.cost(input_tokens, output_tokens),
+            'days': days,
+        }
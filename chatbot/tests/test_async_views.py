@@ -0,0 +1,94 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from chatbot import views
+from chatbot.chatbot import gemini_pool, response_cache, get_response_cache_key
+from chatbot.circuit_breaker import CircuitBreaker
+from chatbot.views import achatbot_view, achatbot_stream_view
+
+from .utils import OFF_TOPIC_QUESTION, FakeChunk, FakeGemini, reset_chatbot_state
+
+# The project urls pick the sync or async views from ASGI_MODE at import time
+urlpatterns = [
+    path('api/chatbot/', achatbot_view),
+    path('api/chatbot/stream/', achatbot_stream_view),
+]
+
+
+class AsyncFakeGemini(FakeGemini):
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if not stream:
+            if self.error:
+                raise self.error
+            return FakeChunk(''.join(self.chunks))
+        return self._astream()
+
+    async def _astream(self):
+        for text in self.chunks:
+            yield FakeChunk(text)
+        if self.error:
+            raise self.error
+
+
+def off_event_loop(func):
+    """Wrap `func` to record whether each call ran on a thread with a running event loop."""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            calls.append('event loop')
+        except RuntimeError:
+            calls.append('thread')
+        return func(*args, **kwargs)
+    return wrapper, calls
+
+
+@override_settings(ROOT_URLCONF='chatbot.tests.test_async_views', CHATBOT_EVENT_LOGGING=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        reset_chatbot_state()
+        for patcher in (
+            mock.patch.object(gemini_pool, 'breaker', CircuitBreaker('test')),
+            mock.patch('chatbot.views.chat_events'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def post(self, url, question=OFF_TOPIC_QUESTION):
+        return await self.async_client.post(url, json.dumps({'question': question}), content_type='application/json', secure=True)
+
+    async def test_answer_from_gemini_is_cached(self):
+        with mock.patch.object(gemini_pool, '_model', AsyncFakeGemini(['Sunny and hot.'])):
+            response = await self.post('/api/chatbot/')
+        self.assertEqual(response.json()['response'], 'Sunny and hot.')
+        self.assertEqual(response_cache.peek(get_response_cache_key(OFF_TOPIC_QUESTION, 'en')), 'Sunny and hot.')
+
+    async def test_stream_sends_tokens_then_done(self):
+        with mock.patch.object(gemini_pool, '_model', AsyncFakeGemini(['Sunny ', 'and hot.'])):
+            response = await self.post('/api/chatbot/stream/')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body.count('event: token'), 2)
+        done = json.loads(body.split('event: done\ndata: ', 1)[1])
+        self.assertEqual(done['response'], 'Sunny and hot.')
+
+    async def test_interrupted_stream_is_not_cached(self):
+        with mock.patch.object(gemini_pool, '_model', AsyncFakeGemini(['Partial '], error=RuntimeError('stream reset'))):
+            response = await self.post('/api/chatbot/stream/')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn('event: error', body)
+        self.assertIsNone(response_cache.peek(get_response_cache_key(OFF_TOPIC_QUESTION, 'en')))
+
+    async def test_knowledge_base_work_runs_off_the_event_loop(self):
+        cache_key, cache_key_calls = off_event_loop(views.get_response_cache_key)
+        remember, remember_calls = off_event_loop(views.remember_answer)
+        with mock.patch.object(gemini_pool, '_model', AsyncFakeGemini(['Sunny and hot.'])), \
+                mock.patch('chatbot.views.get_response_cache_key', cache_key), mock.patch('chatbot.views.remember_answer', remember):
+            await self.post('/api/chatbot/')
+        self.assertEqual(cache_key_calls, ['thread'])
+        self.assertEqual(remember_calls, ['thread'])
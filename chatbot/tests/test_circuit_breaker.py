@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from chatbot.chatbot import DEGRADED_PREFIX, DEGRADED_RESPONSE, degraded_response, knowledge_base
+from chatbot.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from chatbot.gemini_pool import GeminiPool
+
+from .utils import FakeGemini
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('chatbot.circuit_breaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=3, slow_call_ms=500, reset_timeout=30)
+
+    def trip(self):
+        for _ in range(3):
+            self.breaker.allow()
+            self.breaker.record_failure('error')
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure('error')
+        self.breaker.record_failure('error')
+        self.breaker.record_success(100)
+        self.assertEqual(self.breaker.snapshot()['state'], CLOSED)
+        self.trip()
+        self.assertEqual(self.breaker.snapshot()['state'], OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+
+    def test_slow_calls_count_as_failures(self):
+        for _ in range(3):
+            self.breaker.record_success(800)
+        self.assertEqual(self.breaker.snapshot()['state'], OPEN)
+
+    def test_lets_one_probe_through_after_the_reset_timeout(self):
+        self.trip()
+        self.now += 31
+        self.breaker.allow()
+        self.assertEqual(self.breaker.snapshot()['state'], HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()  # only one probe at a time
+
+    def test_successful_probe_closes(self):
+        self.trip()
+        self.now += 31
+        self.breaker.allow()
+        self.breaker.record_success(100)
+        self.assertEqual(self.breaker.snapshot()['state'], CLOSED)
+        self.breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.now += 31
+        self.breaker.allow()
+        self.breaker.record_failure('still down')
+        self.assertEqual(self.breaker.snapshot()['state'], OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+
+    def test_cancelled_probe_lets_the_next_call_probe(self):
+        self.trip()
+        self.now += 31
+        self.breaker.allow()
+        self.breaker.cancel()
+        self.breaker.allow()
+
+    def test_pool_stops_calling_gemini_once_open(self):
+        pool = GeminiPool('test', breaker=self.breaker)
+        model = FakeGemini([], error=RuntimeError('unavailable'))
+        pool.set_model(model)
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                pool.generate('prompt')
+        with self.assertRaises(CircuitOpenError):
+            pool.generate('prompt')
+        self.assertEqual(model.calls, 3)
+
+
+class DegradedResponseTests(TestCase):
+    def setUp(self):
+        knowledge_base.refresh(force=True)
+
+    def test_off_topic_question_gets_the_canned_reply(self):
+        # Its best lexical score (about 0.2) clears the prompt-context floor but not the suggest threshold
+        self.assertEqual(degraded_response('who are you', 'en'), DEGRADED_RESPONSE['en'])
+
+    def test_close_question_gets_the_matching_answer(self):
+        pair = max(knowledge_base.get_pairs('en'), key=lambda pair: len(pair['question']))
+        self.assertEqual(degraded_response(pair['question'] + ' please', 'en'), DEGRADED_PREFIX['en'] + pair['answer'])
@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+
+from chatbot.chatbot import estimate_tokens
+from chatbot.context import ContextCompactor, first_sentence
+
+
+def exchange(i, answer=None):
+    return {'question': f'Question {i} about fiber dosage?', 'answer': answer or f'Answer {i} first sentence. More detail that is dropped.'}
+
+
+class FirstSentenceTests(SimpleTestCase):
+    def test_keeps_the_leading_sentence(self):
+        self.assertEqual(first_sentence('Use 25 kg/m3. Higher for heavy loads!'), 'Use 25 kg/m3.')
+        self.assertEqual(first_sentence('Line one\nLine two'), 'Line one')
+
+    def test_clips_long_sentences(self):
+        self.assertEqual(len(first_sentence('word ' * 100, max_chars=40)), 40)
+
+
+class ContextCompactorTests(SimpleTestCase):
+    def setUp(self):
+        self.compactor = ContextCompactor(estimate_tokens, token_budget=200, recent_turns=1)
+
+    def test_new_conversation_has_no_context(self):
+        self.assertEqual(self.compactor.render([]), '')
+        self.assertEqual(ContextCompactor(estimate_tokens, token_budget=0).render([exchange(1)]), '')
+
+    def test_last_turn_in_full_and_older_ones_summarized(self):
+        context = self.compactor.render([exchange(1), exchange(2)])
+        self.assertIn('EARLIER IN THIS CONVERSATION (summary):\n- User asked: Question 1 about fiber dosage? | CMSbot: Answer 1 first sentence.\n', context)
+        self.assertIn('RECENT CONVERSATION CONTEXT:\nUser: Question 2 about fiber dosage?\nCMSbot: Answer 2 first sentence. More detail that is dropped.', context)
+        self.assertNotIn('Answer 1 first sentence. More detail', context)
+
+    def test_long_conversation_stays_within_the_budget(self):
+        history = [exchange(i, 'A long answer sentence. ' * 50) for i in range(50)]
+        context = self.compactor.render(history)
+        self.assertLessEqual(estimate_tokens(context), 200)
+        # Newest summaries are kept first
+        self.assertIn('Question 48', context)
+        self.assertNotIn('Question 0 ', context)
+
+    def test_long_recent_answer_is_clipped(self):
+        context = self.compactor.render([exchange(1, 'word ' * 2000)])
+        self.assertTrue(context.startswith('RECENT CONVERSATION CONTEXT:\nUser: Question 1'))
+        self.assertLessEqual(estimate_tokens(context), 200)
+
+    def test_zero_recent_turns_summarizes_everything(self):
+        context = ContextCompactor(estimate_tokens, token_budget=200, recent_turns=0).render([exchange(1), exchange(2)])
+        self.assertNotIn('RECENT CONVERSATION CONTEXT', context)
+        self.assertIn('Question 2', context)
+        self.assertNotIn('More detail', context)
+
+    def test_negative_recent_turns_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ContextCompactor(estimate_tokens, recent_turns=-1)
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from chatbot.events import EventSink
+from chatbot.metrics import metrics
+from chatbot.models import ChatEvent
+
+
+class StopLoop(BaseException):
+    pass
+
+
+@override_settings(CHATBOT_EVENT_LOGGING=True)
+class EventSinkTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.sink = EventSink('chatbot.ChatEvent', batch_size=2, flush_interval=0.01, max_queue=3)
+        # Rows are written by flush() in the test thread; the background writer uses its own connection
+        patcher = mock.patch.object(EventSink, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_flush_writes_queued_events_in_batches(self):
+        self.sink.emit('turn', ip='203.0.113.7', lang='en', question='Q', answer='A', tier='exact')
+        self.sink.emit('honeypot', ip='not an ip', question='spam')
+        self.sink.emit('rate_limited', ip='2001:db8::1', tier='session_minute')
+        with self.assertNumQueries(2):
+            self.sink.flush()
+        self.assertEqual(
+            list(ChatEvent.objects.order_by('id').values_list('kind', 'ip')),
+            [('turn', '203.0.113.7'), ('honeypot', None), ('rate_limited', '2001:db8::1')],
+        )
+        self.assertEqual(metrics.snapshot()['counters']['chat_events_written'], 3)
+
+    @override_settings(CHATBOT_EVENT_LOGGING=False)
+    def test_disabled_sink_queues_nothing(self):
+        self.sink.emit('turn', question='Q')
+        self.assertTrue(self.sink._queue.empty())
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        for _ in range(5):
+            self.sink.emit('turn', question='Q')
+        self.assertEqual(self.sink._queue.qsize(), 3)
+        self.assertEqual(metrics.snapshot()['counters']['chat_events_dropped'], 2)
+
+    def test_database_error_drops_the_batch(self):
+        self.sink.emit('turn', question='Q')
+        with mock.patch.object(ChatEvent.objects, 'bulk_create', side_effect=DatabaseError('down')), self.assertLogs('chatbot.events', 'ERROR'):
+            self.sink.flush()
+        self.assertEqual(metrics.snapshot()['counters']['chat_events_dropped'], 1)
+
+    def test_writer_thread_survives_unexpected_errors(self):
+        batches = iter([[{'kind': 'turn'}], [{'kind': 'turn'}]])
+
+        def take_batch(block):
+            try:
+                return next(batches)
+            except StopIteration:
+                raise StopLoop
+        with mock.patch.object(self.sink, '_take_batch', side_effect=take_batch), \
+                mock.patch.object(self.sink, '_write', side_effect=RuntimeError('bug')) as write, \
+                self.assertLogs('chatbot.events', 'ERROR'), self.assertRaises(StopLoop):
+            self.sink._run()
+        self.assertEqual(write.call_count, 2)
+        self.assertEqual(metrics.snapshot()['counters']['chat_events_dropped'], 2)
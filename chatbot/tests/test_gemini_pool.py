@@ -0,0 +1,63 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from chatbot.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from chatbot.gemini_pool import GeminiBusyError, GeminiPool
+
+from .utils import FakeChunk
+
+
+class RecordingModel:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.kwargs = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.kwargs.append(kwargs)
+        return FakeChunk('answer')
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.kwargs.append(kwargs)
+        await asyncio.sleep(self.delay)
+        return FakeChunk('answer')
+
+
+class GeminiPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('test', failure_threshold=1)
+        self.pool = GeminiPool('test', max_concurrency=1, queue_timeout=0.05, timeout=0.1, breaker=self.breaker)
+        self.model = RecordingModel()
+        self.pool.set_model(self.model)
+
+    def test_passes_the_deadline_to_gemini(self):
+        self.assertEqual(self.pool.generate('prompt').text, 'answer')
+        self.assertEqual(self.model.kwargs, [{'request_options': {'timeout': 0.1}}])
+
+    def test_busy_when_no_slot_frees_up_within_the_queue_timeout(self):
+        self.pool._semaphore.acquire()
+        with self.assertRaises(GeminiBusyError):
+            self.pool.generate('prompt')
+        self.assertEqual(self.model.kwargs, [])
+        # A full queue says nothing about Gemini's health
+        self.assertEqual(self.breaker.snapshot()['state'], CLOSED)
+
+    def test_slot_is_released_after_an_error(self):
+        self.model.generate_content = lambda prompt, **kwargs: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            self.pool.generate('prompt')
+        self.assertTrue(self.pool._semaphore.acquire(blocking=False))
+
+    def test_async_call_past_the_deadline_times_out_and_counts_as_a_failure(self):
+        self.model.delay = 1
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(self.pool.agenerate('prompt'))
+        self.assertEqual(self.breaker.snapshot()['state'], OPEN)
+        self.assertTrue(self.pool._semaphore.acquire(blocking=False))
+
+    def test_sync_and_async_calls_share_one_limit(self):
+        self.pool._semaphore.acquire()  # a sync call in flight
+        with self.assertRaises(GeminiBusyError):
+            asyncio.run(self.pool.agenerate('prompt'))
+        self.pool._semaphore.release()
+        self.assertEqual(asyncio.run(self.pool.agenerate('prompt')).text, 'answer')
@@ -0,0 +1,47 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from chatbot import chatbot
+from chatbot.chatbot import knowledge_base
+
+from .utils import reset_chatbot_state
+
+
+@override_settings(CHATBOT_EVENT_LOGGING=False)
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        reset_chatbot_state()
+        # Exact matches, so no turn goes to Gemini
+        self.questions = [pair['question'] for pair in knowledge_base.get_pairs('en')[:6]]
+        patcher = mock.patch.object(chatbot, 'MAX_HISTORY_TURNS', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question, query=''):
+        response = self.client.post(f'/api/chatbot/{query}', json.dumps({'question': question}), content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_history_is_capped_and_responses_carry_only_the_new_exchange(self):
+        for question in self.questions[:5]:
+            payload = self.ask(question)
+        self.assertEqual(payload['exchange']['question'], self.questions[4])
+        self.assertEqual(payload['cursor'], 5)
+        self.assertNotIn('history', payload)
+        history = self.client.session['chat_history']
+        self.assertEqual([item['seq'] for item in history], [3, 4, 5])
+        self.assertEqual([item['question'] for item in history], self.questions[2:5])
+
+    def test_since_returns_the_retained_exchanges_after_the_cursor(self):
+        for question in self.questions[:4]:
+            self.ask(question)
+        payload = self.ask(self.questions[4], '?since=3')
+        self.assertEqual([item['seq'] for item in payload['history']], [4, 5])
+
+    def test_old_or_invalid_cursor_returns_everything_retained(self):
+        for question in self.questions[:4]:
+            self.ask(question)
+        self.assertEqual([item['seq'] for item in self.ask(self.questions[4], '?since=1')['history']], [3, 4, 5])
+        self.assertEqual([item['seq'] for item in self.ask(self.questions[5], '?since=oops')['history']], [4, 5, 6])
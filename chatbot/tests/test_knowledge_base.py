@@ -0,0 +1,71 @@
+import json
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from chatbot.chatbot import QA_DATA_PATH, knowledge_base
+from chatbot.models import QAPair
+
+
+class KnowledgeBaseReloadTests(TestCase):
+    def setUp(self):
+        knowledge_base.refresh(force=True)
+
+    def test_save_reloads_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            QAPair.objects.create(question='Do you ship to Laos?', answer='Yes, through our export partners.', lang='en')
+        self.assertEqual(knowledge_base.exact_answer('Do you ship to Laos?', 'en'), 'Yes, through our export partners.')
+
+    def test_queryset_delete_reloads(self):
+        pair = QAPair.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            QAPair.objects.filter(pk=pair.pk).delete()
+        self.assertIsNone(knowledge_base.exact_answer(pair.question, pair.lang))
+
+    def test_one_reload_per_transaction(self):
+        with mock.patch.object(knowledge_base, 'reload') as reload, self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                QAPair.objects.create(question=f'Question {i}?', answer='Answer.', lang='en')
+            QAPair.objects.filter(question__startswith='Question ').delete()
+        reload.assert_called_once()
+
+    def test_reload_after_a_rolled_back_savepoint(self):
+        with mock.patch.object(knowledge_base, 'reload') as reload, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                sid = transaction.savepoint()
+                QAPair.objects.create(question='Rolled back?', answer='Yes.', lang='en')
+                transaction.savepoint_rollback(sid)
+                QAPair.objects.create(question='Kept?', answer='Yes.', lang='en')
+        reload.assert_called_once()
+
+    def test_reload_survives_a_rolled_back_sibling_savepoint(self):
+        with mock.patch.object(knowledge_base, 'reload') as reload, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                with transaction.atomic():
+                    QAPair.objects.create(question='First?', answer='Yes.', lang='en')
+                try:
+                    with transaction.atomic():
+                        QAPair.objects.create(question='Second?', answer='Yes.', lang='en')
+                        raise RuntimeError('roll back the second savepoint only')
+                except RuntimeError:
+                    pass
+                QAPair.objects.create(question='Third?', answer='Yes.', lang='en')
+        self.assertGreaterEqual(reload.call_count, 1)
+
+
+class SeedMigrationTests(TestCase):
+    def test_migration_seeds_every_json_pair(self):
+        with open(QA_DATA_PATH, encoding='utf-8') as f:
+            questions = {(pair.get('lang', 'en'), pair['question'].strip()) for pair in json.load(f)['qa_pairs']}
+        self.assertEqual(QAPair.objects.count(), len(questions))
+        knowledge_base.refresh(force=True)
+        self.assertEqual(knowledge_base.source, 'database')
+        self.assertEqual(len(knowledge_base.pairs), len(questions))
+
+    def test_file_change_is_not_applied_over_database_rows(self):
+        knowledge_base.refresh(force=True)
+        with mock.patch.object(knowledge_base, '_file_stat', return_value=(0, 0)), self.assertLogs('chatbot.knowledge_base', 'WARNING') as logs:
+            knowledge_base.refresh(force=True)
+        self.assertIn('import_qa_pairs', logs.output[0])
+        self.assertEqual(knowledge_base.source, 'database')
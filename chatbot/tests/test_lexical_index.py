@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+
+from chatbot.lexical_index import LexicalIndex, char_ngrams
+
+
+class FakeKnowledgeBase:
+    def __init__(self, pairs, version='v1'):
+        self.set_pairs(pairs, version)
+
+    def set_pairs(self, pairs, version):
+        self.pairs = pairs
+        self.version = version
+        self.by_lang = {}
+        for pair in pairs:
+            self.by_lang.setdefault(pair['lang'], []).append(pair)
+
+    def refresh(self):
+        return False
+
+
+PAIRS = [
+    {'question': 'What is steel fiber reinforced concrete?', 'answer': 'SFRC', 'lang': 'en'},
+    {'question': 'How much does delivery cost?', 'answer': 'Delivery', 'lang': 'en'},
+    {'question': 'Do you offer installation services?', 'answer': 'Installation', 'lang': 'en'},
+    {'question': 'ราคาไฟเบอร์เหล็กเท่าไหร่', 'answer': 'ราคา', 'lang': 'th'},
+    {'question': 'มีบริการจัดส่งไหม', 'answer': 'จัดส่ง', 'lang': 'th'},
+]
+
+
+class CharNgramTests(SimpleTestCase):
+    def test_ngrams_of_the_normalized_padded_text(self):
+        self.assertEqual(char_ngrams('Ab?'), [' a', 'ab', 'b ', ' ab', 'ab '])
+
+
+class LexicalIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.kb = FakeKnowledgeBase([dict(pair) for pair in PAIRS])
+        self.index = LexicalIndex(self.kb)
+
+    def test_identical_question_scores_one(self):
+        score, pair = self.index.top_k('How much does delivery cost?', 'en', 1)[0]
+        self.assertAlmostEqual(score, 1.0)
+        self.assertEqual(pair['answer'], 'Delivery')
+
+    def test_normalization_does_not_change_the_score(self):
+        self.assertEqual(self.index.top_k('  HOW much does delivery cost!! ', 'en', 1), self.index.top_k('How much does delivery cost?', 'en', 1))
+
+    def test_paraphrase_ranks_the_right_pair_first(self):
+        ranked = self.index.top_k('what does the delivery cost', 'en', 3)
+        self.assertEqual(ranked[0][1]['answer'], 'Delivery')
+        self.assertTrue(0 < ranked[0][0] < 1)
+        self.assertEqual([score for score, _ in ranked], sorted((score for score, _ in ranked), reverse=True))
+
+    def test_thai_without_word_segmentation(self):
+        self.assertEqual(self.index.top_k('ไฟเบอร์เหล็กราคาเท่าไหร่', 'th', 1)[0][1]['answer'], 'ราคา')
+
+    def test_unknown_language_or_no_shared_ngrams(self):
+        self.assertEqual(self.index.top_k('delivery', 'fr'), [])
+        self.assertEqual(self.index.top_k('ฯฯฯ', 'en'), [])
+
+    def test_rebuilds_when_the_knowledge_base_version_changes(self):
+        self.index.top_k('delivery', 'en')
+        removed = self.kb.pairs[0]['question']
+        self.kb.set_pairs([*self.kb.pairs[1:], {'question': 'Do you ship abroad?', 'answer': 'Export', 'lang': 'en'}], 'v2')
+        self.assertEqual(self.index.top_k('Do you ship abroad?', 'en', 1)[0][1]['answer'], 'Export')
+        self.assertNotIn(removed, self.index._terms)
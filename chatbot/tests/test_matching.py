@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from chatbot import chatbot
+from chatbot.chatbot import SUGGESTION_HINT, knowledge_base, lexical_index, match_question
+from chatbot.metrics import metrics
+
+PAIR_A = {'question': 'How much steel fiber per cubic metre?', 'answer': '25-40 kg/m3.', 'lang': 'en'}
+PAIR_B = {'question': 'Which steel fiber suits industrial floors?', 'answer': 'DÚCTIL® 3D fibers.', 'lang': 'en'}
+
+
+class MatchQuestionTests(TestCase):
+    def setUp(self):
+        knowledge_base.refresh(force=True)
+        metrics.reset()
+        # Semantic matching is optional; these tests exercise the lexical path
+        patcher = mock.patch.object(chatbot, 'EMBEDDINGS_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def match_with_scores(self, *scores):
+        ranked = list(zip(scores, (PAIR_A, PAIR_B)))
+        with mock.patch.object(lexical_index, 'top_k', return_value=ranked):
+            return match_question('steel fiber dosage question', 'en')
+
+    def test_exact_tier(self):
+        pair = knowledge_base.get_pairs('en')[3]
+        self.assertEqual(match_question(pair['question'].upper() + '?', 'en'), (pair['answer'], 'exact'))
+        self.assertEqual(metrics.snapshot()['counters'], {'match_exact': 1})
+
+    def test_lexical_tier_at_the_match_threshold(self):
+        self.assertEqual(self.match_with_scores(chatbot.LEXICAL_MATCH_THRESHOLD, 0.3), (PAIR_A['answer'], 'lexical'))
+
+    def test_suggested_tier_lists_every_pair_above_the_suggest_threshold(self):
+        answer, tier = self.match_with_scores(chatbot.LEXICAL_MATCH_THRESHOLD - 0.01, chatbot.LEXICAL_SUGGEST_THRESHOLD)
+        self.assertEqual(tier, 'suggested')
+        self.assertTrue(answer.startswith(SUGGESTION_HINT['en']['many']))
+        self.assertIn(PAIR_A['answer'], answer)
+        self.assertIn(PAIR_B['answer'], answer)
+
+    def test_single_suggestion_names_the_question(self):
+        answer, tier = self.match_with_scores(chatbot.LEXICAL_SUGGEST_THRESHOLD, 0.1)
+        self.assertEqual(tier, 'suggested')
+        self.assertEqual(answer, SUGGESTION_HINT['en']['one'].format(question=PAIR_A['question'].rstrip('?')) + '\n\n' + PAIR_A['answer'])
+
+    def test_miss_below_the_suggest_threshold(self):
+        self.assertEqual(self.match_with_scores(chatbot.LEXICAL_SUGGEST_THRESHOLD - 0.01), (None, None))
+        self.assertEqual(metrics.snapshot()['counters'], {'match_miss': 1})
+
+    def test_off_topic_question_goes_to_gemini(self):
+        self.assertEqual(match_question('Tell me a joke', 'en'), (None, None))
+
+    def test_semantic_tiers_when_an_embedding_backend_is_installed(self):
+        semantic_index = mock.Mock()
+        with mock.patch.object(chatbot, 'EMBEDDINGS_AVAILABLE', True), mock.patch.object(chatbot, 'semantic_index', semantic_index), \
+                mock.patch.object(lexical_index, 'top_k', return_value=[(0.2, PAIR_B)]):
+            semantic_index.top_k.return_value = [(0.9, PAIR_A)]
+            self.assertEqual(match_question('steel fiber dosage question', 'en'), (PAIR_A['answer'], 'semantic'))
+            semantic_index.top_k.return_value = [(chatbot.SEMANTIC_SUGGEST_THRESHOLD, PAIR_A)]
+            self.assertEqual(match_question('steel fiber dosage question', 'en')[1], 'suggested')
+            semantic_index.top_k.return_value = [(0.3, PAIR_A)]
+            self.assertEqual(match_question('steel fiber dosage question', 'en'), (None, None))
@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase, TestCase
+
+from chatbot.chatbot import knowledge_base
+from chatbot.normalize import normalize_question
+
+
+class NormalizeQuestionTests(SimpleTestCase):
+    def test_folds_case_whitespace_and_edge_punctuation(self):
+        self.assertEqual(normalize_question('  What IS   Steel Fiber?? '), 'what is steel fiber')
+        self.assertEqual(normalize_question('"Steel fiber"'), 'steel fiber')
+
+    def test_folds_typographic_variants(self):
+        self.assertEqual(normalize_question('What’s “SFRC”—price?'), normalize_question('What\'s "SFRC"-price?'))
+        self.assertEqual(normalize_question('Ｓｔｅｅｌ　ｆｉｂｅｒ'), 'steel fiber')
+        self.assertEqual(normalize_question('steel​ fiber'), 'steel fiber')
+
+    def test_keeps_inner_punctuation_and_thai_text(self):
+        self.assertEqual(normalize_question('Is 1.5 kg/m3 enough?'), 'is 1.5 kg/m3 enough')
+        self.assertEqual(normalize_question('ราคาเท่าไหร่ครับ ?'), 'ราคาเท่าไหร่ครับ')
+
+    def test_folds_thai_sara_am_variants(self):
+        # SARA AM typed as NIKHAHIT + SARA AA, as some Thai keyboards do
+        self.assertEqual(normalize_question('น้ํา'), normalize_question('น้ำ'))
+
+    def test_empty_input(self):
+        self.assertEqual(normalize_question(None), '')
+        self.assertEqual(normalize_question(' ?! '), '')
+
+
+class ExactAnswerTests(TestCase):
+    def setUp(self):
+        knowledge_base.refresh(force=True)
+        self.pair = knowledge_base.get_pairs('en')[0]
+
+    def test_variants_of_a_stored_question_hit_the_index(self):
+        question = f"  {self.pair['question'].upper()} ??"
+        self.assertEqual(knowledge_base.exact_answer(question, 'en'), self.pair['answer'])
+
+    def test_lookup_is_per_language(self):
+        self.assertIsNone(knowledge_base.exact_answer(self.pair['question'], 'th'))
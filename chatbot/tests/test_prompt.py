@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from chatbot import chatbot
+from chatbot.chatbot import PROMPT_TOKEN_BUDGET, build_gemini_prompt, company_data, estimate_tokens, knowledge_base
+
+
+class BuildGeminiPromptTests(TestCase):
+    def setUp(self):
+        knowledge_base.refresh(force=True)
+        self.pair = knowledge_base.get_pairs('en')[1]
+
+    def build(self, question, lang='en', history=()):
+        return build_gemini_prompt(question, company_data[lang], lang, list(history))
+
+    def test_includes_the_retrieved_pairs_within_the_budget(self):
+        prompt = self.build(self.pair['question'])
+        self.assertIn(f"Q: {self.pair['question']}\nA: {self.pair['answer']}", prompt)
+        self.assertLessEqual(estimate_tokens(prompt), PROMPT_TOKEN_BUDGET)
+
+    def test_unmatched_question_gets_the_same_short_prompt(self):
+        prompt = self.build('Tell me a joke')
+        self.assertIn('KNOWLEDGE BASE: no Q&A pair matches this question.', prompt)
+        self.assertNotIn('\nQ: ', prompt)
+        self.assertLessEqual(estimate_tokens(prompt), PROMPT_TOKEN_BUDGET // 2)
+
+    def test_thai_question_within_the_budget(self):
+        pair = knowledge_base.get_pairs('th')[0]
+        prompt = self.build(pair['question'], 'th')
+        self.assertTrue(prompt.startswith(chatbot.RAG_PROMPT_HEADER['th']))
+        self.assertLessEqual(estimate_tokens(prompt), PROMPT_TOKEN_BUDGET)
+
+    def test_long_conversation_stays_within_the_budget(self):
+        history = [{'question': f'Question {i} about steel fiber dosage?', 'answer': 'A long answer. ' * 40} for i in range(30)]
+        prompt = self.build(self.pair['question'], history=history)
+        self.assertIn('RECENT CONVERSATION CONTEXT:', prompt)
+        self.assertLessEqual(estimate_tokens(prompt), PROMPT_TOKEN_BUDGET)
+
+    def test_small_budget_keeps_only_the_most_relevant_pair(self):
+        with mock.patch.object(chatbot, 'PROMPT_TOKEN_BUDGET', 1):
+            prompt = self.build(self.pair['question'])
+        self.assertEqual(prompt.count('\nQ: '), 1)
+        self.assertIn(f"Q: {self.pair['question']}", prompt)
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from chatbot.ratelimit import SlidingWindowLimiter, get_client_ip
+
+
+class SlidingWindowLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowLimiter('test', limit=3, window=60)
+
+    def test_allows_up_to_the_limit_then_asks_to_retry(self):
+        results = [self.limiter.hit('1.2.3.4', now=600 + i) for i in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertEqual(results[-1][1], 57)
+
+    def test_keys_are_counted_separately(self):
+        for _ in range(3):
+            self.limiter.hit('1.2.3.4', now=600)
+        self.assertTrue(self.limiter.hit('5.6.7.8', now=600)[0])
+
+    def test_previous_window_counts_by_its_overlap(self):
+        for _ in range(3):
+            self.limiter.hit('1.2.3.4', now=659)
+        # 15s into the next window three quarters of the previous one still overlap: 1 + 3 * 0.75 > 3
+        self.assertFalse(self.limiter.hit('1.2.3.4', now=675)[0])
+
+    def test_previous_window_fades_out(self):
+        for _ in range(3):
+            self.limiter.hit('1.2.3.4', now=659)
+        # 45s in only a quarter does: 1 + 3 * 0.25 <= 3
+        self.assertTrue(self.limiter.hit('1.2.3.4', now=705)[0])
+
+    def test_workers_share_the_counter(self):
+        other_worker = SlidingWindowLimiter('test', limit=3, window=60)
+        for _ in range(3):
+            other_worker.hit('1.2.3.4', now=600)
+        self.assertFalse(self.limiter.hit('1.2.3.4', now=600)[0])
+
+
+class GetClientIpTests(SimpleTestCase):
+    def request(self, forwarded=None):
+        headers = {'REMOTE_ADDR': '10.0.0.1'}
+        if forwarded is not None:
+            headers['HTTP_X_FORWARDED_FOR'] = forwarded
+        return RequestFactory().get('/', **headers)
+
+    @override_settings(TRUSTED_PROXY_COUNT=0)
+    def test_ignores_x_forwarded_for_without_trusted_proxies(self):
+        self.assertEqual(get_client_ip(self.request('6.6.6.6')), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_takes_the_address_the_trusted_proxy_saw(self):
+        # The client can prepend anything; only the rightmost entry comes from the proxy
+        self.assertEqual(get_client_ip(self.request('6.6.6.6, 203.0.113.7')), '203.0.113.7')
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_counts_hops_from_the_right(self):
+        self.assertEqual(get_client_ip(self.request('6.6.6.6, 203.0.113.7, 10.1.1.1')), '203.0.113.7')
+        self.assertEqual(get_client_ip(self.request('203.0.113.7')), '203.0.113.7')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_falls_back_to_remote_addr(self):
+        self.assertEqual(get_client_ip(self.request(' , ')), '10.0.0.1')
+        self.assertEqual(get_client_ip(self.request()), '10.0.0.1')
@@ -0,0 +1,77 @@
+import asyncio
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from chatbot.chatbot import knowledge_base, get_response_cache_key
+from chatbot.models import QAPair
+from chatbot.response_cache import ResponseCache, response_cache_key
+
+
+class ResponseCacheKeyTests(SimpleTestCase):
+    def test_stable_and_normalized(self):
+        key = response_cache_key('What is SFRC?', 'en', 'v1')
+        self.assertEqual(key, response_cache_key('  what is sfrc ', 'en', 'v1'))
+        self.assertRegex(key, r'^chatbot_response:[0-9a-f]{32}$')
+
+    def test_depends_on_language_and_knowledge_base_version(self):
+        key = response_cache_key('What is SFRC?', 'en', 'v1')
+        self.assertNotEqual(key, response_cache_key('What is SFRC?', 'th', 'v1'))
+        self.assertNotEqual(key, response_cache_key('What is SFRC?', 'en', 'v2'))
+
+
+class GetResponseCacheKeyTests(TestCase):
+    def test_changes_when_the_knowledge_base_changes(self):
+        knowledge_base.refresh(force=True)
+        before = get_response_cache_key('What is SFRC?', 'en')
+        with self.captureOnCommitCallbacks(execute=True):
+            QAPair.objects.create(question='Do you ship to Laos?', answer='Yes.', lang='en')
+        self.assertNotEqual(get_response_cache_key('What is SFRC?', 'en'), before)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = ResponseCache(ttl=60, l1_ttl=10, l1_max_entries=2)
+
+    def test_set_writes_both_layers(self):
+        self.cache.set('key', 'answer')
+        self.assertEqual(cache.get('key'), 'answer')
+        self.assertEqual(self.cache._l1_get('key'), 'answer')
+
+    def test_l2_hit_fills_l1(self):
+        cache.set('key', 'from another worker')
+        self.assertEqual(self.cache.get('key'), 'from another worker')
+        cache.delete('key')
+        self.assertEqual(self.cache.get('key'), 'from another worker')
+
+    def test_l1_entries_expire(self):
+        self.cache.set('key', 'answer')
+        cache.delete('key')
+        with mock.patch('chatbot.response_cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(self.cache.get('key'))
+
+    def test_l1_evicts_the_least_recently_used_entry(self):
+        for key in ('a', 'b'):
+            self.cache.set(key, key)
+        self.cache.get('a')
+        self.cache.set('c', 'c')
+        self.assertEqual(list(self.cache._l1), ['a', 'c'])
+
+    def test_peek_reads_only_the_shared_cache(self):
+        self.cache._l1_set('key', 'local only')
+        self.assertIsNone(self.cache.peek('key'))
+
+    def test_clear_local_keeps_l2(self):
+        self.cache.set('key', 'answer')
+        self.cache.clear_local()
+        self.assertEqual(self.cache._l1, {})
+        self.assertEqual(self.cache.get('key'), 'answer')
+
+    def test_async_get_and_set(self):
+        async def roundtrip():
+            await self.cache.aset('key', 'answer')
+            self.cache.clear_local()
+            return await self.cache.aget('key')
+        self.assertEqual(asyncio.run(roundtrip()), 'answer')
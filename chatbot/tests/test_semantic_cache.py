@@ -0,0 +1,106 @@
+import json
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from chatbot.chatbot import gemini_pool, knowledge_base, recent_answers, response_cache, get_response_cache_key
+from chatbot.circuit_breaker import CircuitBreaker
+from chatbot.semantic_cache import SemanticResponseCache, meaning_markers
+
+from .utils import FakeGemini, reset_chatbot_state
+
+DOSAGE = 'What concrete dosage should I use for a 150 mm garage slab?'
+
+
+class MeaningMarkerTests(SimpleTestCase):
+    def test_numbers_are_kept_in_order(self):
+        self.assertEqual(meaning_markers('Price for 1,000 bags of 50 kg?')[0], ('1000', '50'))
+
+    def test_english_and_thai_negations(self):
+        self.assertEqual(meaning_markers("Isn't it suitable? Not for roofs")[1], ("isn't", 'not'))
+        self.assertEqual(meaning_markers('ใช้กับงานภายนอกไม่ได้ใช่ไหม')[1], ('ไม่',))
+        # ใหม่ (new) and ไหม (question particle) are not negations
+        self.assertEqual(meaning_markers('มีสินค้าใหม่ไหม'), ((), ()))
+
+
+class LexicalSemanticCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = SemanticResponseCache(threshold=0.5, lexical_threshold=0.97)
+        self.cache.add(DOSAGE, 'en', 1, 'Use 7 bags per cubic metre.')
+
+    def test_reuses_an_answer_for_a_trivial_rewording(self):
+        self.assertEqual(self.cache.lookup(DOSAGE.replace('garage', 'garage,'), 'en', 1), 'Use 7 bags per cubic metre.')
+
+    def test_uses_the_lexical_threshold_without_an_embedding_model(self):
+        self.assertEqual(self.cache.threshold, 0.97)
+        self.assertIsNone(self.cache.lookup(DOSAGE.replace('dosage', 'mix'), 'en', 1))
+
+    def test_different_numbers_are_not_duplicates(self):
+        self.cache.threshold = 0.9  # these pairs score 0.94-0.97; only the markers keep them apart
+        self.assertIsNone(self.cache.lookup(DOSAGE.replace('150', '250'), 'en', 1))
+
+    def test_negated_question_is_not_a_duplicate(self):
+        self.cache.threshold = 0.9
+        self.cache.add('Is the sealant suitable for outdoor use?', 'en', 1, 'Yes.')
+        self.assertIsNone(self.cache.lookup('Is the sealant not suitable for outdoor use?', 'en', 1))
+
+    def test_other_language_and_knowledge_base_version_miss(self):
+        self.assertIsNone(self.cache.lookup(DOSAGE, 'th', 1))
+        self.assertIsNone(self.cache.lookup(DOSAGE, 'en', 2))
+        self.assertEqual(self.cache._entries, {})
+
+    def test_expired_entries_miss(self):
+        with mock.patch('chatbot.semantic_cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(self.cache.lookup(DOSAGE, 'en', 1))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SemanticResponseCache(threshold=0.5, max_entries=2)
+        for i in range(3):
+            cache.add(f'Question number {i}?', 'en', 1, f'Answer {i}')
+        self.assertIsNone(cache.lookup('Question number 0?', 'en', 1))
+        self.assertEqual(cache.lookup('Question number 2?', 'en', 1), 'Answer 2')
+
+
+class EmbeddingSemanticCacheTests(SimpleTestCase):
+    def setUp(self):
+        vectors = {'a': [1.0, 0.0], 'b': [0.96, 0.28], 'c': [0.6, 0.8]}
+        self.cache = SemanticResponseCache(threshold=0.9, embed=lambda text: np.array(vectors[text.split()[-1]]))
+
+    def test_uses_the_embedding_threshold(self):
+        self.cache.add('question a', 'en', 1, 'Answer A')
+        self.assertEqual(self.cache.lookup('reworded b', 'en', 1), 'Answer A')
+        self.assertIsNone(self.cache.lookup('unrelated c', 'en', 1))
+
+    def test_numbers_must_match(self):
+        self.cache.add('dosage 150 a', 'en', 1, 'Answer A')
+        self.assertIsNone(self.cache.lookup('dosage 250 b', 'en', 1))
+
+
+@override_settings(CHATBOT_EVENT_LOGGING=False)
+class SemanticCacheViewTests(TestCase):
+    def setUp(self):
+        reset_chatbot_state()
+        patcher = mock.patch.object(gemini_pool, 'breaker', CircuitBreaker('test'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question):
+        response = self.client.post('/api/chatbot/', json.dumps({'question': question}), content_type='application/json', secure=True)
+        return response.json()['response']
+
+    def test_reused_answer_is_not_cached_under_the_new_question(self):
+        reworded = DOSAGE.replace('garage', 'garage,')
+        recent_answers.add(DOSAGE, 'en', knowledge_base.version, 'Use 7 bags per cubic metre.')
+        model = FakeGemini(['Gemini answer.'])
+        with mock.patch.object(gemini_pool, '_model', model):
+            self.assertEqual(self.ask(reworded), 'Use 7 bags per cubic metre.')
+        self.assertEqual(model.calls, 0)
+        self.assertIsNone(response_cache.peek(get_response_cache_key(reworded, 'en')))
+
+    def test_different_numbers_each_go_to_gemini(self):
+        model = FakeGemini(['Gemini answer.'])
+        with mock.patch.object(gemini_pool, '_model', model):
+            self.ask(DOSAGE)
+            self.ask(DOSAGE.replace('150', '250'))
+        self.assertEqual(model.calls, 2)
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from chatbot.single_flight import SingleFlight
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flights = SingleFlight(lock_ttl=10, wait_timeout=5, poll_interval=0.01)
+
+    def run_concurrently(self, compute, callers=5):
+        results, errors = [], []
+        started = threading.Barrier(callers)
+
+        def call():
+            started.wait()
+            try:
+                results.append(self.flights.run('question', compute, lambda: None))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_callers_share_one_computation(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'answer'
+
+        results, errors = self.run_concurrently(compute)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(computed for _, computed in results), [False, False, False, False, True])
+        self.assertEqual({answer for answer, _ in results}, {'answer'})
+
+    def test_waiters_compute_when_the_leader_fails(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            if len(calls) == 1:
+                raise RuntimeError('Gemini error')
+            return 'answer'
+
+        results, errors = self.run_concurrently(compute, callers=3)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual([answer for answer, _ in results], ['answer', 'answer'])
+
+    def test_lock_is_released_after_the_call(self):
+        self.flights.run('question', lambda: 'answer', lambda: None)
+        self.assertIsNone(cache.get(self.flights._lock_key('question')))
+        self.assertEqual(self.flights._flights, {})
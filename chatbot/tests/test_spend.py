@@ -0,0 +1,58 @@
+import threading
+from datetime import date
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from chatbot.spend import SpendTracker
+
+
+class SpendTrackerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # $1 per 1k input tokens and $2 per 1k output tokens against a $10 budget
+        self.tracker = SpendTracker(10, 1.0, 2.0, alert_email='ops@example.com')
+
+    def test_spend_comes_from_token_counts(self):
+        self.assertAlmostEqual(self.tracker.record(1000, 500), 2.0)
+        self.assertAlmostEqual(self.tracker.record(500, 0), 2.5)
+        self.assertAlmostEqual(self.tracker.month_spend(), 2.5)
+        self.assertFalse(self.tracker.is_over_budget())
+
+    def test_concurrent_records_are_all_counted(self):
+        threads = [threading.Thread(target=lambda: [self.tracker.record(10, 5) for _ in range(50)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.tracker._read(self.tracker.month_key()), (8 * 50 * 10, 8 * 50 * 5))
+
+    def test_one_alert_per_threshold(self):
+        self.tracker.record(4000, 0)  # 40%
+        self.assertEqual(mail.outbox, [])
+        self.tracker.record(2000, 0)  # 60%: crosses 50%
+        self.tracker.record(1000, 0)  # 70%: still past 50% only
+        self.assertEqual([message.subject for message in mail.outbox], ['Chatbot Monthly Budget 50% Used'])
+        self.tracker.record(5000, 0)  # 120%: crosses 80% and 100% at once
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Chatbot Monthly Budget 50% Used', 'Chatbot Monthly Budget 80% Used', 'Chatbot Monthly Budget Exceeded'],
+        )
+        self.assertTrue(self.tracker.is_over_budget())
+
+    def test_new_month_starts_from_zero(self):
+        with mock.patch('chatbot.spend.timezone.localdate', return_value=date(2026, 1, 31)):
+            self.tracker.record(6000, 0)
+        with mock.patch('chatbot.spend.timezone.localdate', return_value=date(2026, 2, 1)):
+            self.tracker.record(1000, 0)
+            self.assertAlmostEqual(self.tracker.month_spend(), 1.0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_daily_report(self):
+        with mock.patch('chatbot.spend.timezone.localdate', return_value=date(2026, 2, 3)):
+            self.tracker.record(1000, 1000)
+        report = self.tracker.daily_report(2026, 2)
+        self.assertEqual(report['days'], [{'date': '2026-02-03', 'input_tokens': 1000, 'output_tokens': 1000, 'cost': 3.0}])
+        self.assertAlmostEqual(report['spend'], 3.0)
@@ -0,0 +1,48 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from chatbot.chatbot import gemini_pool, knowledge_base, response_cache, recent_answers, get_response_cache_key, GEMINI_ERROR_RESPONSE
+from chatbot.circuit_breaker import CircuitBreaker
+
+from .utils import OFF_TOPIC_QUESTION, FakeGemini, reset_chatbot_state
+
+
+@override_settings(CHATBOT_EVENT_LOGGING=False)
+class StreamViewTests(TestCase):
+    def setUp(self):
+        reset_chatbot_state()
+        patcher = mock.patch.object(gemini_pool, 'breaker', CircuitBreaker('test'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask_stream(self, model, question=OFF_TOPIC_QUESTION):
+        with mock.patch.object(gemini_pool, '_model', model), mock.patch('chatbot.views.chat_events') as events:
+            response = self.client.post('/api/chatbot/stream/', json.dumps({'question': question}), content_type='application/json', secure=True)
+            body = b''.join(response.streaming_content).decode()
+        turns = [call.kwargs for call in events.emit.call_args_list if call.args == ('turn',)]
+        return body, turns
+
+    def test_completed_stream_is_cached(self):
+        body, turns = self.ask_stream(FakeGemini(['Sunny ', 'and hot.']))
+        self.assertIn('event: token', body)
+        self.assertNotIn('event: error', body)
+        self.assertEqual(response_cache.peek(get_response_cache_key(OFF_TOPIC_QUESTION, 'en')), 'Sunny and hot.')
+        self.assertEqual(turns[0]['tier'], 'gemini')
+
+    def test_interrupted_stream_is_not_cached(self):
+        body, turns = self.ask_stream(FakeGemini(['Partial answer '], error=RuntimeError('stream reset')))
+        self.assertIn('event: error', body)
+        done = json.loads(body.split('event: done\ndata: ', 1)[1])
+        self.assertEqual(done['response'], GEMINI_ERROR_RESPONSE)
+        self.assertIsNone(response_cache.peek(get_response_cache_key(OFF_TOPIC_QUESTION, 'en')))
+        self.assertIsNone(recent_answers.lookup(OFF_TOPIC_QUESTION, 'en', knowledge_base.version))
+        self.assertEqual(turns[0]['tier'], 'fallback')
+
+    def test_failure_before_first_chunk_is_a_fallback_reply(self):
+        body, turns = self.ask_stream(FakeGemini([], error=RuntimeError('unavailable')))
+        self.assertNotIn('event: error', body)
+        self.assertIn(GEMINI_ERROR_RESPONSE, body)
+        self.assertIsNone(response_cache.peek(get_response_cache_key(OFF_TOPIC_QUESTION, 'en')))
+        self.assertEqual(turns[0]['tier'], 'fallback')
@@ -0,0 +1,21 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from chatbot import chatbot
+from chatbot.warmup import warm_up
+
+
+class PreloadWarmUpTests(TestCase):
+    def warm_up_master(self, backend):
+        with mock.patch.multiple(chatbot, EMBEDDINGS_AVAILABLE=True, EMBEDDING_BACKEND=backend, get_embedding_model=mock.DEFAULT) as patched, \
+                mock.patch('chatbot.warmup.warm_up_inference') as inference:
+            warm_up(inference=False)
+        inference.assert_not_called()
+        return patched['get_embedding_model']
+
+    def test_master_loads_sentence_transformers_weights_without_running_them(self):
+        self.warm_up_master('sentence-transformers').assert_called_once_with()
+
+    def test_master_does_not_build_an_onnx_session(self):
+        self.warm_up_master('onnx').assert_not_called()
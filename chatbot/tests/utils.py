@@ -0,0 +1,44 @@
+from django.core.cache import cache
+
+from chatbot.chatbot import knowledge_base, response_cache, recent_answers
+
+# Retrieves no Q&A pair, so it always goes to Gemini
+OFF_TOPIC_QUESTION = 'What is the weather like in Bangkok today?'
+
+
+class FakeChunk:
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGemini:
+    """Stand-in for genai.GenerativeModel whose stream yields `chunks`, then raises `error` if given."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if not stream:
+            if self.error:
+                raise self.error
+            return FakeChunk(''.join(self.chunks))
+        return self._stream()
+
+    def _stream(self):
+        for text in self.chunks:
+            yield FakeChunk(text)
+        if self.error:
+            raise self.error
+
+
+def reset_chatbot_state():
+    cache.clear()
+    response_cache.clear_local()
+    with recent_answers._lock:
+        recent_answers._entries.clear()
+    knowledge_base.refresh(force=True)
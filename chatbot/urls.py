@@ -1,6 +1,19 @@
-from django.urls import path
-from .views import chatbot_view
+from django.conf import settings
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
+from .views import chatbot_view, achatbot_view, chatbot_stream_view, achatbot_stream_view
+from .views_admin import AdminChatbotSpendViewSet, AdminChatbotKnowledgeBaseViewSet, AdminChatbotHealthViewSet, AdminQAPairViewSet
+
+# Admin API routes (SimpleRouter: CMSapp's DefaultRouter already serves the /api/ root)
+router = SimpleRouter()
+router.register(r'admin/chatbot/spend', AdminChatbotSpendViewSet, basename='admin-chatbot-spend')
+router.register(r'admin/chatbot/knowledge-base', AdminChatbotKnowledgeBaseViewSet, basename='admin-chatbot-knowledge-base')
+router.register(r'admin/chatbot/health', AdminChatbotHealthViewSet, basename='admin-chatbot-health')
+router.register(r'admin/chatbot/qa-pairs', AdminQAPairViewSet, basename='admin-chatbot-qa-pair')
 
 urlpatterns = [
-    path('chatbot/', chatbot_view, name='chatbot'),
-]
\ No newline at end of file
+    # Async views under ASGI (uvicorn workers), sync views under WSGI gunicorn threads
+    path('chatbot/', achatbot_view if settings.ASGI_MODE else chatbot_view, name='chatbot'),
+    path('chatbot/stream/', achatbot_stream_view if settings.ASGI_MODE else chatbot_stream_view, name='chatbot-stream'),
+    path('', include(router.urls)),
+]
@@ -1,56 +1,323 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.core.cache import cache
+import json
 import time
+from asgiref.sync import sync_to_async
 from .chatbot import (
-    initialize_session, validate_input, find_match, generate_gemini_response,
-    record_cost_and_check_limit, load_qa_data, company_data, MAX_MESSAGES_PER_SESSION
+    initialize_session, ainitialize_session, validate_input, match_question, last_usage,
+    generate_gemini_response, agenerate_gemini_response, stream_gemini_response, astream_gemini_response,
+    GeminiStreamInterrupted,
+    company_data, append_exchange, MAX_MESSAGES_PER_SESSION,
+    response_cache, get_response_cache_key, find_recent_answer, remember_answer, is_fallback_response,
+    popular_questions, gemini_flights
 )
+from .events import chat_events
+from .ratelimit import get_client_ip
+from .single_flight import LEAD
 
-@csrf_exempt
-def chatbot_view(request):
-    ip = request.META.get('REMOTE_ADDR', 'unknown')
-    now = time.time()
-    ip_key = f"ip_rate_{ip}"
-    ip_requests = cache.get(ip_key, [])
-    ip_requests = [t for t in ip_requests if now - t < 60]
-    if len(ip_requests) >= 50:
-        return JsonResponse({'error': 'Too many requests from your IP. Please wait.'}, status=429)
-    ip_requests.append(now)
-    cache.set(ip_key, ip_requests, 60)
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Invalid method'}, status=405)
-    current_time = time.time()
-    initialize_session(request, current_time)
+def begin_session_turn(request, ip, current_time):
+    """Session limits and validation on an initialized session; returns (error_response, turn)."""
     if request.session['chat_count'] >= MAX_MESSAGES_PER_SESSION:
-        return JsonResponse({'error': 'You’ve reached the 500-message limit for this session.'}, status=429)
+        chat_events.emit('rate_limited', tier='session_total', ip=ip, conversation_id=request.session['conversation_id'])
+        return JsonResponse({'error': 'You’ve reached the 500-message limit for this session.'}, status=429), None
     request.session['question_timestamps'] = [t for t in request.session['question_timestamps'] if current_time - t < 60]
     if len(request.session['question_timestamps']) >= 10:
-        return JsonResponse({'error': 'Rate limit exceeded. Please wait before asking more questions.'}, status=429)
+        chat_events.emit('rate_limited', tier='session_minute', ip=ip, conversation_id=request.session['conversation_id'])
+        return JsonResponse({'error': 'Rate limit exceeded. Please wait before asking more questions.'}, status=429), None
     validation_error, user_question, lang = validate_input(request, ip)
     if validation_error:
-        return JsonResponse(validation_error, status=400)
-    data_lang = company_data[lang]
+        return JsonResponse(validation_error, status=400), None
     request.session['question_timestamps'].append(current_time)
     request.session['last_activity'] = current_time
     request.session['chat_count'] += 1
     request.session.modified = True
-    cache_key = f"response_{hash(user_question)}"
-    cached_response = cache.get(cache_key)
+    last_usage.set(None)
+    return None, {
+        'started': time.perf_counter(),
+        'ip': ip,
+        'tier': None,
+        'question': user_question,
+        'lang': lang,
+        'data_lang': company_data[lang],
+        'cache_key': get_response_cache_key(user_question, lang),
+    }
+
+
+def start_turn(request):
+    """Apply session limits and validation; returns (error_response, turn).
+
+    Per-IP limits are enforced earlier by chatbot.ratelimit.RateLimitMiddleware.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405), None
+    current_time = time.time()
+    initialize_session(request, current_time)
+    return begin_session_turn(request, get_client_ip(request), current_time)
+
+
+async def astart_turn(request):
+    """Async start_turn: session I/O is awaited and the checks run off the event loop.
+
+    begin_session_turn() computes the cache key, which may reload the
+    knowledge base from the database.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405), None
+    current_time = time.time()
+    await ainitialize_session(request, current_time)
+    return await sync_to_async(begin_session_turn, thread_sensitive=False)(request, get_client_ip(request), current_time)
+
+
+def match_answer(turn):
+    """Answer from the Q&A set or a recent near-duplicate Gemini answer; returns (answer, cacheable).
+
+    Near-duplicate answers are not cached under this question's key: a wrong
+    reuse would otherwise be served for the full response cache TTL.
+    """
+    answer, turn['tier'] = match_question(turn['question'], turn['lang'])
+    if answer:
+        return answer, True
+    answer = find_recent_answer(turn['question'], turn['lang'])
+    turn['tier'] = 'semantic_cache' if answer else None
+    return answer, False
+
+
+def quick_answer(turn):
+    """Answer from the response cache, the Q&A set or a recent near-duplicate; returns (answer, cacheable)."""
+    if popular_questions.record(turn['question'], turn['lang']):
+        popular_questions.flush()
+    cached_response = response_cache.get(turn['cache_key'])
     if cached_response:
-        request.session['chat_history'].append({'question': user_question, 'answer': cached_response})
-        request.session.modified = True
-        return JsonResponse({'response': cached_response, 'history': request.session['chat_history'], 'remaining': MAX_MESSAGES_PER_SESSION - request.session['chat_count']})
-    if record_cost_and_check_limit():
-        fallback_response = "This chatbot is temporarily unavailable. Please try again later."
-        request.session['chat_history'].append({'question': user_question, 'answer': fallback_response})
-        request.session.modified = True
-        return JsonResponse({'response': fallback_response, 'history': request.session['chat_history'], 'remaining': MAX_MESSAGES_PER_SESSION - request.session['chat_count']})
-    qa_pairs = load_qa_data()
-    lang_qa = [pair for pair in qa_pairs if pair.get('lang', 'en') == lang]
-    match = find_match(user_question, lang_qa)
-    chatbot_response = match if match else generate_gemini_response(user_question, lang_qa, data_lang, lang, request)
-    cache.set(cache_key, chatbot_response, 300)
-    request.session['chat_history'].append({'question': user_question, 'answer': chatbot_response})
-    request.session.modified = True
-    return JsonResponse({'response': chatbot_response, 'history': request.session['chat_history'], 'remaining': MAX_MESSAGES_PER_SESSION - request.session['chat_count']})
\ No newline at end of file
+        turn['tier'] = 'cache'
+        return cached_response, False
+    return match_answer(turn)
+
+
+async def aquick_answer(turn):
+    """Async quick_answer; the cache is awaited and matching runs off the event loop."""
+    if popular_questions.record(turn['question'], turn['lang']):
+        await sync_to_async(popular_questions.flush)()
+    cached_response = await response_cache.aget(turn['cache_key'])
+    if cached_response:
+        turn['tier'] = 'cache'
+        return cached_response, False
+    return await sync_to_async(match_answer, thread_sensitive=False)(turn)
+
+
+def store_generated_answer(turn, answer):
+    """Index a Gemini answer for near-duplicate reuse and cache it; fallbacks are never cached."""
+    remember_answer(turn['question'], turn['lang'], answer)
+    if not is_fallback_response(answer):
+        response_cache.set(turn['cache_key'], answer)
+
+
+def generate_answer(turn, chat_history):
+    """Gemini answer for the turn; identical questions in flight share one call.
+
+    The leader caches its answer before releasing the waiters, so requests in
+    other workers find it by polling the shared cache.
+    """
+    def compute():
+        answer = generate_gemini_response(turn['question'], turn['data_lang'], turn['lang'], chat_history)
+        store_generated_answer(turn, answer)
+        return answer
+
+    answer, computed = gemini_flights.run(turn['cache_key'], compute, lambda: response_cache.peek(turn['cache_key']))
+    turn['tier'] = 'gemini' if computed else 'coalesced'
+    return answer
+
+
+async def agenerate_answer(turn, chat_history):
+    """Async generate_answer: waiting for another request's call happens off the event loop."""
+    key = turn['cache_key']
+    role, flight = await sync_to_async(gemini_flights.begin)(key)
+    if role != LEAD:
+        answer = await sync_to_async(gemini_flights.wait, thread_sensitive=False)(key, role, flight, lambda: response_cache.peek(key))
+        if answer is not None:
+            turn['tier'] = 'coalesced'
+            return answer
+    turn['tier'] = 'gemini'
+    answer = None
+    try:
+        answer = await agenerate_gemini_response(turn['question'], turn['data_lang'], turn['lang'], chat_history)
+        # Fingerprinting may run the embedding model
+        await sync_to_async(remember_answer, thread_sensitive=False)(turn['question'], turn['lang'], answer)
+        if not is_fallback_response(answer):
+            await response_cache.aset(key, answer)
+        return answer
+    finally:
+        if role == LEAD:
+            await sync_to_async(gemini_flights.finish)(key, flight, answer)
+
+
+def log_turn(request, turn, answer):
+    """Queue the turn for the ChatEvent table (written in batches by a background thread)."""
+    tier = 'fallback' if turn['tier'] == 'gemini' and is_fallback_response(answer) else turn['tier']
+    input_tokens, output_tokens = last_usage.get() or (0, 0)
+    chat_events.emit(
+        'turn',
+        conversation_id=request.session['conversation_id'],
+        ip=turn['ip'],
+        lang=turn['lang'],
+        question=turn['question'],
+        answer=answer,
+        tier=tier or '',
+        latency_ms=(time.perf_counter() - turn['started']) * 1000,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+    )
+
+
+def finish_turn(request, turn, answer, cacheable=True):
+    """Cache the answer and append the exchange to the session history.
+
+    Returns only the new exchange and a cursor; clients that missed replies
+    can pass ?since=<cursor> to also receive the retained exchanges after it.
+    """
+    if cacheable:
+        response_cache.set(turn['cache_key'], answer)
+    log_turn(request, turn, answer)
+    exchange = append_exchange(request, turn['question'], answer)
+    payload = {'response': answer, 'exchange': exchange, 'cursor': exchange['seq'], 'remaining': MAX_MESSAGES_PER_SESSION - request.session['chat_count']}
+    since = request.GET.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            since = 0
+        payload['history'] = [item for item in request.session['chat_history'] if item.get('seq', 0) > since]
+    return payload
+
+
+@csrf_exempt
+def chatbot_view(request):
+    error_response, turn = start_turn(request)
+    if error_response:
+        return error_response
+    answer, cacheable = quick_answer(turn)
+    if not answer:
+        answer, cacheable = generate_answer(turn, request.session['chat_history']), False
+    return JsonResponse(finish_turn(request, turn, answer, cacheable))
+
+
+@csrf_exempt
+async def achatbot_view(request):
+    """Async chatbot_view for ASGI deployments: waiting on Gemini does not hold a thread."""
+    error_response, turn = await astart_turn(request)
+    if error_response:
+        return error_response
+    answer, cacheable = await aquick_answer(turn)
+    if not answer:
+        answer, cacheable = await agenerate_answer(turn, request.session['chat_history']), False
+    if cacheable:
+        await response_cache.aset(turn['cache_key'], answer)
+    return JsonResponse(finish_turn(request, turn, answer, cacheable=False))
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@csrf_exempt
+def chatbot_stream_view(request):
+    """Same as chatbot_view, but streams Gemini's answer as Server-Sent Events.
+
+    Cached, exact-match and semantic-match answers are sent as a single `done`
+    event; Gemini answers are sent as `token` events followed by `done`. A
+    request that waited for an identical question already in flight gets
+    that answer as a single `done` event. If Gemini fails part way through,
+    an `error` event tells the client to discard the tokens it got, and the
+    `done` event carries the fallback reply instead.
+    """
+    error_response, turn = start_turn(request)
+    if error_response:
+        return error_response
+    answer, cacheable = quick_answer(turn)
+
+    def events():
+        if answer:
+            payload = finish_turn(request, turn, answer, cacheable)
+        else:
+            key = turn['cache_key']
+            role, flight = gemini_flights.begin(key)
+            shared = gemini_flights.wait(key, role, flight, lambda: response_cache.peek(key)) if role != LEAD else None
+            if shared is not None:
+                turn['tier'] = 'coalesced'
+                payload = finish_turn(request, turn, shared, cacheable=False)
+            else:
+                turn['tier'] = 'gemini'
+                chunks, generated, reply = [], None, None
+                try:
+                    for text in stream_gemini_response(turn['question'], turn['data_lang'], turn['lang'], request.session['chat_history']):
+                        chunks.append(text)
+                        yield sse_event('token', {'text': text})
+                    generated = reply = ''.join(chunks).strip()
+                    store_generated_answer(turn, generated)
+                except GeminiStreamInterrupted as e:
+                    # The partial answer is neither cached nor kept in the history
+                    reply = e.fallback
+                    yield sse_event('error', {'message': reply})
+                finally:
+                    if role == LEAD:
+                        gemini_flights.finish(key, flight, generated)
+                payload = finish_turn(request, turn, reply, cacheable=False)
+        # SessionMiddleware has already saved by the time the stream is consumed
+        request.session.save()
+        yield sse_event('done', payload)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+async def achatbot_stream_view(request):
+    """Async chatbot_stream_view for ASGI deployments.
+
+    Django's ASGI handler reads a sync streaming iterator in one go
+    (sync_to_async(list)), which would send the whole answer at once; this
+    view streams from an async generator so every token goes out as it arrives.
+    """
+    error_response, turn = await astart_turn(request)
+    if error_response:
+        return error_response
+    answer, cacheable = await aquick_answer(turn)
+
+    async def events():
+        if answer:
+            if cacheable:
+                await response_cache.aset(turn['cache_key'], answer)
+            payload = finish_turn(request, turn, answer, cacheable=False)
+        else:
+            key = turn['cache_key']
+            role, flight = await sync_to_async(gemini_flights.begin)(key)
+            shared = None
+            if role != LEAD:
+                shared = await sync_to_async(gemini_flights.wait, thread_sensitive=False)(key, role, flight, lambda: response_cache.peek(key))
+            if shared is not None:
+                turn['tier'] = 'coalesced'
+                payload = finish_turn(request, turn, shared, cacheable=False)
+            else:
+                turn['tier'] = 'gemini'
+                chunks, generated, reply = [], None, None
+                try:
+                    async for text in astream_gemini_response(turn['question'], turn['data_lang'], turn['lang'], request.session['chat_history']):
+                        chunks.append(text)
+                        yield sse_event('token', {'text': text})
+                    generated = reply = ''.join(chunks).strip()
+                    await sync_to_async(store_generated_answer, thread_sensitive=False)(turn, generated)
+                except GeminiStreamInterrupted as e:
+                    reply = e.fallback
+                    yield sse_event('error', {'message': reply})
+                finally:
+                    if role == LEAD:
+                        await sync_to_async(gemini_flights.finish)(key, flight, generated)
+                payload = finish_turn(request, turn, reply, cacheable=False)
+        await request.session.asave()
+        yield sse_event('done', payload)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,79 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from django.utils import timezone
+from .chatbot import spend_tracker, knowledge_base, gemini_pool
+from .metrics import metrics
+from .models import QAPair
+from .serializers import QAPairSerializer
+
+
+class AdminChatbotSpendViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        """
+        Admin-only API endpoint for Gemini token usage and spend per day.
+        Optional ?month=YYYY-MM (defaults to the current month).
+        """
+        month = request.GET.get('month')
+        if month:
+            try:
+                year, month = (int(part) for part in month.split('-'))
+                if not 1 <= month <= 12:
+                    raise ValueError
+            except ValueError:
+                return Response({'error': 'month must be YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            today = timezone.localdate()
+            year, month = today.year, today.month
+        return Response(spend_tracker.daily_report(year, month))
+
+
+class AdminChatbotKnowledgeBaseViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        """Admin-only API endpoint for the loaded Q&A knowledge base version."""
+        knowledge_base.refresh()
+        return Response({
+            'version': knowledge_base.version,
+            'pairs': len(knowledge_base.pairs),
+            'source': knowledge_base.source,
+            'languages': {lang: len(pairs) for lang, pairs in knowledge_base.by_lang.items()},
+            'last_change': knowledge_base.last_change,
+        })
+
+    @action(detail=False, methods=['post'])
+    def reload(self, request):
+        """Reload the Q&A pairs in every worker without restarting gunicorn."""
+        return Response(knowledge_base.reload())
+
+
+class AdminChatbotHealthViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        """Admin-only API endpoint for the Gemini circuit breaker and chatbot counters of the worker that answers."""
+        return Response({
+            'gemini': {
+                'model': gemini_pool.model_name,
+                'timeout_s': gemini_pool.timeout,
+                'max_concurrency': gemini_pool.max_concurrency,
+                'breaker': gemini_pool.breaker.snapshot(),
+            },
+            'metrics': metrics.snapshot(),
+        })
+
+
+class AdminQAPairViewSet(viewsets.ModelViewSet):
+    """Chatbot Q&A pairs; each save embeds the question and reloads the knowledge base in every worker."""
+    queryset = QAPair.objects.all()
+    serializer_class = QAPairSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        lang = self.request.query_params.get('lang')
+        return queryset.filter(lang=lang) if lang else queryset
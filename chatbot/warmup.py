@@ -0,0 +1,88 @@
+import os
+import time
+import logging
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def memory_usage():
+    """Resident and private (not shared with other processes) memory of this process in MB.
+
+    Read from /proc (Linux); values are None elsewhere. With gunicorn --preload the
+    difference between the two is what the workers share copy-on-write with the master.
+    """
+    usage = {'rss_mb': None, 'private_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line[0].isdigit())
+    except OSError:
+        return usage
+    def mb(*names):
+        return round(sum(int(fields.get(name, '0 kB').split()[0]) for name in names) / 1024, 1)
+    usage['rss_mb'] = mb('Rss')
+    usage['private_mb'] = mb('Private_Clean', 'Private_Dirty')
+    return usage
+
+
+def warm_up(inference=True):
+    """Load the knowledge base, the embedding model and every index so the first question does not pay for it.
+
+    With inference=False the model is never run. The gunicorn master under
+    GUNICORN_PRELOAD must not start the torch/OpenMP or onnxruntime thread
+    pools, which do not survive fork; each worker calls warm_up_inference()
+    instead. Only sentence-transformers weights are loaded in the master:
+    an onnxruntime InferenceSession starts its thread pool as soon as it is
+    built, so the onnx model is left to the workers entirely.
+    """
+    from .chatbot import knowledge_base, lexical_index, get_embedding_model, EMBEDDINGS_AVAILABLE, EMBEDDING_BACKEND
+    started = time.perf_counter()
+    knowledge_base.refresh(force=True)
+    lexical_index.ensure_fresh()
+    if EMBEDDINGS_AVAILABLE and inference:
+        warm_up_inference()
+    elif EMBEDDINGS_AVAILABLE and EMBEDDING_BACKEND != 'onnx':
+        get_embedding_model()
+    # The connection opened to read QAPair rows must not be inherited by forked workers
+    connections.close_all()
+    usage = memory_usage()
+    logger.info(
+        f"Chatbot warm-up done in {(time.perf_counter() - started) * 1000:.0f}ms: {len(knowledge_base.pairs)} Q&A pairs, "
+        f"embeddings {EMBEDDING_BACKEND or 'unavailable'}, RSS {usage['rss_mb']}MB"
+    )
+
+
+def warm_up_inference():
+    """Build the semantic index and run the model once in this process."""
+    from .chatbot import semantic_index, get_embedding_model, embed_question, EMBEDDINGS_AVAILABLE
+    if not EMBEDDINGS_AVAILABLE or get_embedding_model() is None:
+        return
+    semantic_index.ensure_fresh()
+    embed_question('warm-up')  # the first encode() also starts the inference runtime
+
+
+def _preloaded():
+    # gunicorn.conf.py loads the app in the master, before forking, when this is set
+    return os.environ.get('GUNICORN_PRELOAD', 'False') == 'True'
+
+
+def _run_if_enabled(step, *args):
+    if not getattr(settings, 'CHATBOT_WARMUP', False):
+        return
+    try:
+        step(*args)
+    except Exception as e:
+        # A cold start is slower but still works, so never keep the server from starting
+        logger.error(f"Chatbot warm-up failed: {e}")
+
+
+def warm_up_if_enabled():
+    """Called from wsgi.py/asgi.py once the app is loaded, before the server accepts requests."""
+    _run_if_enabled(warm_up, not _preloaded())
+
+
+def warm_up_worker_if_enabled():
+    """Called from gunicorn's post_worker_init when the app was preloaded in the master."""
+    _run_if_enabled(warm_up_inference)
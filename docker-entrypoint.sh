@@ -6,4 +6,9 @@ set -o pipefail
 python manage.py migrate --noinput
 python manage.py create_superuser || true
 
+# Optional: pre-load chatbot answers into the shared (Redis) response cache
+if [ "${CHATBOT_WARM_CACHE:-0}" = "1" ]; then
+  python manage.py warm_chatbot_cache || true
+fi
+
 exec "$@"
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings shared by every start command (gunicorn reads ./gunicorn.conf.py
+automatically; bind, workers, threads and timeout stay on the command line).
+
+GUNICORN_PRELOAD=True loads the Django app in the master before forking. Together with
+CHATBOT_WARMUP=True the embedding model weights and the Q&A lexical index are
+then loaded once and shared copy-on-write by all workers instead of once per worker.
+The model is not run in the master (inference thread pools do not survive fork): each
+worker encodes once and builds its semantic index in post_worker_init. The onnx backend
+is not loaded in the master at all, since its session starts a thread pool when built.
+"""
+
+import gc
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'False') == 'True'
+
+
+def when_ready(server):
+    from chatbot.warmup import memory_usage
+    if preload_app:
+        # Keep the garbage collector from touching (and so copying) the preloaded objects in every worker
+        gc.freeze()
+    usage = memory_usage()
+    server.log.info(f"Master {os.getpid()} ready (preload={preload_app}): RSS {usage['rss_mb']}MB")
+
+
+def post_worker_init(worker):
+    # Runs after the worker loaded (or inherited) the app and before it accepts connections
+    from chatbot.warmup import memory_usage, warm_up_worker_if_enabled
+    if preload_app:
+        # The master only loaded the model; its first encode() must happen after the fork
+        warm_up_worker_if_enabled()
+    usage = memory_usage()
+    worker.log.info(f"Worker {worker.pid} started: RSS {usage['rss_mb']}MB, private {usage['private_mb']}MB")